@@ -0,0 +1,401 @@
+### modified Bass model as numpy expressions over a batch of parameter sets ###
+
+import numpy as np
+import pandas as pd
+
+
+CONSTANTS = {"marketing_efficiency": 0.011, "fruitfulness": 0.015, "sociability": 50}
+
+INITIAL = {"Customers": 1000, "Competitor customers": 1000, "Potential Customers": 100_000.0}
+
+PARAMS = ["p11", "p13", "p21", "p23"]
+
+
+def flows(customers, competitor_customers, potential_customers, p11, p13, p21, p23,
+          marketing_efficiency=0.011, fruitfulness=0.015, sociability=50):
+    """
+    Flows of main.py for arrays of stocks and parameters (broadcast together)
+    """
+
+    leave_rate = marketing_efficiency / (marketing_efficiency + fruitfulness)
+    change_rate = fruitfulness / (marketing_efficiency + fruitfulness)
+
+    total_market = customers + potential_customers + competitor_customers
+    market_share = customers / total_market
+    competitor_share = competitor_customers / total_market
+
+    word_of_mouth_demand = fruitfulness * sociability * potential_customers * customers * p11 / total_market
+    word_of_competitive_mouth_demand = (
+        fruitfulness * sociability * potential_customers * competitor_customers * p21 / total_market
+    )
+    direct_marketing = potential_customers * marketing_efficiency
+
+    return {
+        "new_customers": word_of_mouth_demand + direct_marketing,
+        "competitor_new_customers": word_of_competitive_mouth_demand + direct_marketing,
+        "churn": leave_rate * p13 * customers,
+        "churn_competitor": competitor_customers * p23 * leave_rate,
+        "changed": (
+            fruitfulness * sociability * customers * p21 * competitor_share
+            * (1 - p13 * change_rate - p11) * leave_rate
+        ),
+        "competitor_changed": (
+            fruitfulness * sociability * competitor_customers * p11 * market_share
+            * (1 - p23 * change_rate - p21) * leave_rate
+        ),
+    }
+
+
+def derivatives(customers, competitor_customers, potential_customers, **params):
+    """Derivatives of Customers, Competitor customers and Potential Customers"""
+
+    f = flows(customers, competitor_customers, potential_customers, **params)
+
+    return (
+        f["new_customers"] - f["churn"] - f["changed"] + f["competitor_changed"],
+        f["competitor_new_customers"] - f["churn_competitor"] - f["competitor_changed"] + f["changed"],
+        -f["new_customers"] - f["competitor_new_customers"] + f["churn_competitor"] + f["churn"],
+    )
+
+
+def integrate(params, initial_time=0, final_time=200, time_step=0.1, saveper=1.0, constants=None,
+              steady_tol=None, steady_window=20):
+    """
+    Euler integration of all parameter sets at once, the same scheme as PySD.
+    params: DataFrame or dict of arrays with p11, p13, p21, p23.
+
+    With steady_tol a trajectory is frozen once all its stock derivatives
+    relative to the total market stayed below steady_tol for steady_window
+    units of time, the integration stops when every trajectory is frozen.
+
+    Returns a dict of stocks, market share and competitor share arrays
+    with shape (number of saved times, batch size), the saved times and,
+    with steady_tol, the converged flags and the times of convergence.
+    """
+
+    constants = dict(CONSTANTS, **(constants or {}))
+    params = {name: np.asarray(params[name], dtype=float) for name in PARAMS}
+    batch = len(params["p11"])
+
+    num_steps = int(round((final_time - initial_time) / time_step))
+    save_every = int(round(saveper / time_step))
+    saved = np.empty((len(INITIAL), num_steps // save_every + 1, batch))
+
+    # a frozen trajectory is written into all the later saved rows,
+    # the arrays are compacted when a quarter of them is frozen
+    active = np.arange(batch)
+    stocks = np.repeat(np.array(list(INITIAL.values()), dtype=float)[:, None], batch, axis=1)
+    frozen = np.zeros(batch, dtype=bool)
+    calm_time = np.zeros(batch)
+    converged_time = np.full(batch, np.nan)
+
+    for step in range(num_steps + 1):
+        if step % save_every == 0:
+            row = step // save_every
+            if frozen.any():
+                saved[:, row, active[~frozen]] = stocks[:, ~frozen]
+            else:
+                saved[:, row, active] = stocks
+        if step == num_steps or frozen.all():
+            break
+
+        d = np.array(derivatives(*stocks, **params, **constants))
+        rate = np.abs(d).max(axis=0) / stocks.sum(axis=0) if steady_tol is not None else None
+        stocks = stocks + time_step * d
+
+        if steady_tol is not None:
+            calm_time = np.where(rate < steady_tol, calm_time + time_step, 0)
+            done = (calm_time >= steady_window - 1e-9) & ~frozen
+
+            if done.any():
+                saved[:, row + 1:, active[done]] = stocks[:, None, done]
+                converged_time[active[done]] = initial_time + (step + 1) * time_step
+                frozen |= done
+
+            if frozen.sum() * 4 >= len(frozen) and not frozen.all():
+                keep = ~frozen
+                active, stocks, calm_time, frozen = active[keep], stocks[:, keep], calm_time[keep], frozen[keep]
+                params = {name: p[keep] for name, p in params.items()}
+
+    # rows up to the first saved time at or after the stop, after an early stop
+    # the rows past the last saved one hold the frozen states
+    num_rows = min(-(-step // save_every) + 1, saved.shape[1])
+
+    res = {name: saved[i, :num_rows] for i, name in enumerate(INITIAL)}
+    total_market = res["Customers"] + res["Competitor customers"] + res["Potential Customers"]
+    res["market share"] = res["Customers"] / total_market
+    res["competitor share"] = res["Competitor customers"] / total_market
+    res["time"] = initial_time + saveper * np.arange(num_rows)
+
+    if steady_tol is not None:
+        res["converged"] = ~np.isnan(converged_time)
+        res["converged_time"] = converged_time
+
+    return res
+
+
+def generate_parameters(n, constraint=1.0, seed=None):
+    """n parameter sets as generate_parameters of the notebook: p11 + p13 <= constraint, p21 + p23 <= constraint"""
+
+    rng = np.random.default_rng(seed)
+
+    p11 = rng.uniform(size=n)
+    p13 = rng.uniform(0, constraint - p11)
+    p21 = rng.uniform(size=n)
+    p23 = rng.uniform(0, constraint - p21)
+
+    return pd.DataFrame({"p11": p11, "p13": p13, "p21": p21, "p23": p23})
+
+
+def play_bass(params, return_columns=("market share", "competitor share"), check_share=0.1, tol=1e-4,
+              steady_tol=None, **kwargs):
+    """
+    Final values of return_columns for every parameter set which settled:
+    changes over the last check_share of the saved points are below tol (as play_bass of the notebook).
+    With steady_tol the runs stop early and the settled ones are the converged ones (see integrate).
+    """
+
+    params = pd.DataFrame(params)[PARAMS].reset_index(drop=True)
+    res = integrate(params, steady_tol=steady_tol, **kwargs)
+
+    if steady_tol is not None:
+        settled = res["converged"]
+    else:
+        tail = int(len(res["time"]) * check_share)
+        settled = np.ones(len(params), dtype=bool)
+        for key in return_columns:
+            settled &= (np.abs(np.diff(res[key][-tail:], axis=0)) < tol).all(axis=0)
+
+    frame = params.assign(**{key: res[key][-1] for key in return_columns})
+    return frame[settled].reset_index(drop=True)
+
+
+STARTS = [(1000 / 102_000, 1000 / 102_000), (0.45, 0.45), (0.9, 0.05), (0.05, 0.9), (0.1, 0.1)]
+
+
+def share_coefficients(params, constants):
+    """
+    Coefficients (a1, a2, b1, b2, m, g) of the share derivatives, see share_derivatives.
+    params: p11, p13, p21, p23 as floats or arrays.
+    """
+
+    m, f, s = constants["marketing_efficiency"], constants["fruitfulness"], constants["sociability"]
+    leave_rate = m / (m + f)
+    change_rate = f / (m + f)
+    p11, p13, p21, p23 = (params[name] for name in PARAMS)
+
+    changed = f * s * p21 * (1 - p13 * change_rate - p11) * leave_rate
+    competitor_changed = f * s * p11 * (1 - p23 * change_rate - p21) * leave_rate
+
+    return (f * s * p11, f * s * p21, leave_rate * p13, leave_rate * p23, m,
+            competitor_changed - changed)
+
+
+def share_derivatives(c, k, coefs):
+    """
+    Derivatives of the market share c and the competitor share k and their jacobian.
+    The flows of main.py divided by the constant total market give, with P = 1 - c - k,
+        dc = (a1 c + m) P - b1 c + g c k
+        dk = (a2 k + m) P - b2 k - g c k
+    Plain arithmetic, so it works on floats and on arrays.
+    Returns (dc, dk, d dc/dc, d dc/dk, d dk/dc, d dk/dk).
+    """
+
+    a1, a2, b1, b2, m, g = coefs
+    p = 1 - c - k
+    inflow_c, inflow_k = a1 * c + m, a2 * k + m
+
+    return (
+        inflow_c * p - b1 * c + g * c * k,
+        inflow_k * p - b2 * k - g * c * k,
+        a1 * p - inflow_c - b1 + g * k,
+        g * c - inflow_c,
+        -inflow_k - g * k,
+        a2 * p - inflow_k - b2 - g * c,
+    )
+
+
+def is_stable(j00, j01, j10, j11):
+    """Both eigenvalues of the 2x2 jacobian have negative real parts"""
+
+    return (j00 + j11 < 0) & (j00 * j11 - j01 * j10 > 0)
+
+
+def newton(c, k, coefs, rtol=1e-10, max_iter=30, roots=(), dup_tol=1e-6, max_bounded=8):
+    """
+    Newton iterations for the zero of the share derivatives of a batch, steps are
+    shortened to keep the shares inside the simplex. A point leaves the iterations
+    when its full step is below rtol of its shares (converged), when it comes within
+    dup_tol of one of `roots` ((c, k) arrays of roots already found, nan where none),
+    or when the boundary shortened its last `max_bounded` steps: direct marketing keeps
+    the shares off the boundary, so it chases a root outside the simplex.
+    The rest of the batch goes on.
+
+    Returns the shares and the converged, duplicate and stable flags.
+    """
+
+    c, k = np.array(c, dtype=float), np.array(k, dtype=float)
+    n = len(c)
+    converged, duplicate = np.zeros(n, dtype=bool), np.zeros(n, dtype=bool)
+
+    idx, cs, ks, sub = np.arange(n), c.copy(), k.copy(), coefs
+    bounded = np.zeros(n, dtype=int)
+
+    for _ in range(max_iter):
+        F0, F1, j00, j01, j10, j11 = share_derivatives(cs, ks, sub)
+
+        det = j00 * j11 - j01 * j10
+        with np.errstate(divide="ignore", invalid="ignore"):
+            dc = np.nan_to_num((j11 * F0 - j01 * F1) / det)
+            dk = np.nan_to_num((j00 * F1 - j10 * F0) / det)
+
+            # the step is shortened to stay inside the simplex
+            bound = np.minimum(np.minimum(np.where(dc > 0, cs / dc, np.inf), np.where(dk > 0, ks / dk, np.inf)),
+                               np.where(dc + dk < 0, (1 - cs - ks) / -(dc + dk), np.inf))
+        alpha = np.minimum(1, 0.9 * bound)
+
+        cs, ks = cs - alpha * dc, ks - alpha * dk
+        step = alpha * (np.abs(dc) + np.abs(dk))
+        bounded = np.where(alpha < 1, bounded + 1, 0)
+
+        near = np.zeros(len(idx), dtype=bool)
+        for root_c, root_k in roots:
+            near |= np.abs(cs - root_c[idx]) + np.abs(ks - root_k[idx]) < dup_tol
+        done = (alpha == 1) & (step <= rtol * (cs + ks)) & ~near
+        leave = done | near | (bounded >= max_bounded) | (step < 1e-15)
+
+        if leave.any():
+            left = idx[leave]
+            c[left], k[left] = cs[leave], ks[leave]
+            converged[left], duplicate[left] = done[leave], near[leave]
+
+            keep = ~leave
+            idx, cs, ks, bounded = idx[keep], cs[keep], ks[keep], bounded[keep]
+            sub = tuple(v[keep] if np.ndim(v) else v for v in sub)
+            if not len(idx):
+                break
+
+    c[idx], k[idx] = cs, ks
+    stable = is_stable(*share_derivatives(c, k, coefs)[2:])
+
+    return c, k, converged, duplicate, stable
+
+
+def newton_point(c, k, coefs, rtol=1e-10, max_iter=30, roots=(), dup_tol=1e-6, max_bounded=8):
+    """newton for one parameter set on plain floats, roots: list of (c, k)"""
+
+    bounded = 0
+    for _ in range(max_iter):
+        F0, F1, j00, j01, j10, j11 = share_derivatives(c, k, coefs)
+
+        det = j00 * j11 - j01 * j10
+        if det == 0:
+            break
+        dc = (j11 * F0 - j01 * F1) / det
+        dk = (j00 * F1 - j10 * F0) / det
+
+        alpha = 1.0
+        if dc > 0:
+            alpha = min(alpha, 0.9 * c / dc)
+        if dk > 0:
+            alpha = min(alpha, 0.9 * k / dk)
+        if dc + dk < 0:
+            alpha = min(alpha, 0.9 * (1 - c - k) / -(dc + dk))
+
+        c, k = c - alpha * dc, k - alpha * dk
+        step = alpha * (abs(dc) + abs(dk))
+
+        if any(abs(c - root_c) + abs(k - root_k) < dup_tol for root_c, root_k in roots):
+            return c, k, False, True, False
+        if alpha == 1 and step <= rtol * (c + k):
+            return c, k, True, False, bool(is_stable(*share_derivatives(c, k, coefs)[2:]))
+
+        bounded = bounded + 1 if alpha < 1 else 0
+        if bounded >= max_bounded or step < 1e-15:
+            break
+
+    return c, k, False, False, False
+
+
+def equilibrium(params, constants=None, rtol=1e-10, steady_tol=1e-7, final_time=5000, **kwargs):
+    """
+    Long-run market share and competitor share found directly as the fixed point
+    of the stock derivatives: Newton from several starting shares, the point is
+    accepted if it is the only stable fixed point found.
+    Otherwise (none or several stable points) the model is integrated with
+    steady_tol up to final_time (kwargs go to integrate) and the result is refined by Newton.
+
+    Returns params with the equilibrium shares and stocks, `stable` and `method`.
+    See equilibrium_point for a single parameter set.
+    """
+
+    constants = dict(CONSTANTS, **(constants or {}))
+    params = pd.DataFrame(params)[PARAMS].reset_index(drop=True)
+    values = {name: params[name].values.astype(float) for name in PARAMS}
+    coefs = share_coefficients(values, constants)
+    total_market = sum(INITIAL.values())
+    n = len(params)
+
+    # a start that comes close to a root of the previous starts is dropped
+    roots = []
+    c, k = np.full(n, np.nan), np.full(n, np.nan)
+    distinct = np.zeros(n, dtype=int)
+    for start in STARTS:
+        root_c, root_k, converged, _, stable = newton(np.full(n, start[0]), np.full(n, start[1]), coefs,
+                                                      rtol, roots=roots)
+        roots.append((np.where(converged, root_c, np.nan), np.where(converged, root_k, np.nan)))
+
+        ok = converged & stable
+        first = ok & np.isnan(c)
+        c[first], k[first] = root_c[first], root_k[first]
+        distinct += ok
+
+    method = np.where(distinct == 1, "newton", "integration")
+    stable = distinct == 1
+
+    fallback = np.flatnonzero(distinct != 1)
+    if len(fallback):
+        sub = {name: v[fallback] for name, v in values.items()}
+        res = integrate(sub, constants=constants, steady_tol=steady_tol, final_time=final_time,
+                        saveper=final_time, **kwargs)
+        end_c, end_k = res["market share"][-1], res["competitor share"][-1]
+
+        fc, fk, converged, _, fstable = newton(end_c, end_k, share_coefficients(sub, constants), rtol)
+        # Newton refines the integrated state only if it stays in the same point
+        refined = converged & fstable & (np.abs(fc - end_c) < 1e-2)
+        c[fallback] = np.where(refined, fc, end_c)
+        k[fallback] = np.where(refined, fk, end_k)
+        stable[fallback] = refined
+
+    return params.assign(**{
+        "Customers": c * total_market, "Competitor customers": k * total_market,
+        "Potential Customers": (1 - c - k) * total_market,
+        "market share": c, "competitor share": k, "stable": stable, "method": method,
+    })
+
+
+def equilibrium_point(p11, p13, p21, p23, constants=None, rtol=1e-10, **kwargs):
+    """
+    equilibrium of one parameter set on plain floats, returns a dict of the shares,
+    `stable` and `method`. Falls back to equilibrium (integration) in the same cases.
+    """
+
+    constants = dict(CONSTANTS, **(constants or {}))
+    params = {"p11": p11, "p13": p13, "p21": p21, "p23": p23}
+    coefs = share_coefficients(params, constants)
+
+    roots, found = [], []
+    for start_c, start_k in STARTS:
+        c, k, converged, _, stable = newton_point(start_c, start_k, coefs, rtol, roots=roots)
+        if converged:
+            roots.append((c, k))
+            if stable:
+                found.append((c, k))
+
+    if len(found) != 1:
+        row = equilibrium({name: [value] for name, value in params.items()}, constants, rtol, **kwargs).iloc[0]
+        return {"market share": row["market share"], "competitor share": row["competitor share"],
+                "stable": bool(row["stable"]), "method": "integration"}
+
+    c, k = found[0]
+    return {"market share": c, "competitor share": k, "stable": True, "method": "newton"}
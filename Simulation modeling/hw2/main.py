@@ -160,6 +160,7 @@ def p23():
     units="probabilty",
     comp_type="Constant",
     comp_subtype="Normal",
+    depends_on={"marketing_efficiency": 2, "fruitfulness": 1},
 )
 
 def leave_rate():
@@ -171,6 +172,7 @@ def leave_rate():
     units="probabilty",
     comp_type="Constant",
     comp_subtype="Normal",
+    depends_on={"fruitfulness": 2, "marketing_efficiency": 1},
 )
 
 def change_rate():
@@ -342,7 +344,7 @@ def churn_competitor():
     units="person/month",
     comp_type="Auxiliary",
     comp_subtype="Normal",
-    depends_on={"competitor_customers": 1,
+    depends_on={"customers": 1, "competitor_share": 1,
                 "p13": 1, "p11": 1, "p21": 1, "leave_rate": 1,
                 "change_rate": 1, "fruitfulness": 1, "sociability": 1},
 )
@@ -0,0 +1,390 @@
+import random
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+from collections import deque
+
+from recorder import TrajectoryRecorder
+import stats
+
+
+# max number of directed pairs evaluated at once in the all-pairs mode
+PAIRS_BLOCK_SIZE = 2**22
+
+
+def directed_changes(x, u, src, dst, coef):
+    """
+    Influence of agents `src` on agents `dst` over directed pairs.
+    Same rule as PolicitalModel.calculate_pair_update, one side at a time.
+
+    Contributions are summed per receiver in the order of the pairs,
+    so for a fixed order the result matches the object model exactly.
+    """
+
+    x_src, x_dst, u_src, u_dst = x[src], x[dst], u[src], u[dst]
+
+    h = np.minimum(x_src + u_src, x_dst + u_dst) - np.maximum(x_src - u_src, x_dst - u_dst)
+
+    hit = h > u_src
+    if not hit.all():
+        src, dst, h = src[hit], dst[hit], h[hit]
+        x_src, x_dst, u_src, u_dst = x_src[hit], x_dst[hit], u_src[hit], u_dst[hit]
+        if not np.isscalar(coef):
+            coef = coef[hit]
+
+    k = coef * (h / u_src - 1)
+
+    dx = np.bincount(dst, weights=k * (x_src - x_dst), minlength=len(x))
+    du = np.bincount(dst, weights=k * (u_src - u_dst), minlength=len(x))
+
+    return dx, du, len(dst)
+
+
+def matching_changes(x, u, pairs, coef):
+    """Changes for a perfect matching, pairs has shape (N/2, 2)"""
+
+    src = pairs.ravel()
+    dst = pairs[:, ::-1].ravel()
+
+    return directed_changes(x, u, src, dst, coef)
+
+
+def all_pairs_changes(x, u, coef, order=None, receivers=None):
+    """
+    Changes when everyone meets everyone.
+    Influencers of each receiver are taken in `order` (the agents order),
+    receivers are processed in blocks to keep memory bounded.
+    """
+
+    n = len(x)
+    order = np.arange(n) if order is None else order
+    receivers = order if receivers is None else receivers
+
+    dx, du, hits = np.zeros(n), np.zeros(n), 0
+    block = max(1, PAIRS_BLOCK_SIZE // n)
+
+    for start in range(0, len(receivers), block):
+        dst_block = receivers[start:start + block]
+
+        dst = np.repeat(dst_block, n)
+        src = np.tile(order, len(dst_block))
+
+        not_self = src != dst
+        block_dx, block_du, block_hits = directed_changes(x, u, src[not_self], dst[not_self], coef)
+
+        # every receiver lives in exactly one block, so this keeps the summation order
+        dx += block_dx
+        du += block_du
+        hits += block_hits
+
+    return dx, du, hits
+
+
+def overlap_changes(x, u, coef, receivers=None, weights=None):
+    """
+    Changes when everyone meets everyone, visiting only pairs that can interact.
+
+    Agent i can move agent j only if h_ij > u_i, which needs |x_i - x_j| < u_j,
+    so the influencers of j are found with a binary search in the agents
+    sorted by opinion. The cost is O(N log N + number of such pairs).
+    Results agree with all_pairs_changes up to the summation order.
+    With `weights` the influence of agent i is also multiplied on weights[i].
+    """
+
+    n = len(x)
+    receivers = np.arange(n) if receivers is None else receivers
+
+    order = np.argsort(x, kind='stable')
+    x_sorted = x[order]
+
+    # slightly wider windows, the exact condition is checked in directed_changes
+    lo = np.searchsorted(x_sorted, x[receivers] - u[receivers] - 1e-12, side='left')
+    hi = np.searchsorted(x_sorted, x[receivers] + u[receivers] + 1e-12, side='right')
+    return segment_changes(x, u, coef, receivers, lo, hi - lo, order, weights)
+
+
+def graph_changes(x, u, coef, graph, receivers=None):
+    """
+    Changes when every agent meets all its neighbours in `graph` (networks.Graph),
+    the cost is O(number of edges). coef is a scalar or an array per receiver.
+    """
+
+    receivers = np.arange(graph.n) if receivers is None else receivers
+    starts = graph.indptr[receivers]
+
+    return segment_changes(x, u, coef, receivers, starts, graph.indptr[receivers + 1] - starts,
+                           graph.indices)
+
+
+def segment_changes(x, u, coef, receivers, starts, counts, pool, weights=None):
+    """
+    Influencers of receivers[k] are pool[starts[k]:starts[k] + counts[k]],
+    blocks of receivers are processed so that a block has about PAIRS_BLOCK_SIZE pairs.
+    coef is a scalar or an array per receiver, weights an array per influencer.
+    """
+
+    n = len(x)
+    ends = np.cumsum(counts)
+
+    dx, du, hits = np.zeros(n), np.zeros(n), 0
+
+    start = 0
+    while start < len(receivers):
+        done = ends[start - 1] if start > 0 else 0
+        stop = max(start + 1, np.searchsorted(ends, done + PAIRS_BLOCK_SIZE, side='right'))
+
+        block_counts = counts[start:stop]
+        total = block_counts.sum()
+
+        dst = np.repeat(receivers[start:stop], block_counts)
+        offsets = np.arange(total) - np.repeat(np.cumsum(block_counts) - block_counts, block_counts)
+        src = pool[np.repeat(starts[start:stop], block_counts) + offsets]
+
+        not_self = src != dst
+        src, dst = src[not_self], dst[not_self]
+
+        edge_coef = coef if np.isscalar(coef) else coef[dst]
+        if weights is not None:
+            edge_coef = edge_coef * weights[src]
+        block_dx, block_du, block_hits = directed_changes(x, u, src, dst, edge_coef)
+
+        # every receiver lives in exactly one block, so this keeps the summation order
+        dx += block_dx
+        du += block_du
+        hits += block_hits
+
+        start = stop
+
+    return dx, du, hits
+
+
+class ArrayPoliticalModel:
+    """
+    Array-backed version of PolicitalModel.
+    Opinions, uncertainties and extremist flags are stored as numpy arrays
+    and every step is computed with batched operations.
+
+    The agents are paired by their indices. With mesa_order=True the model
+    also replays the shuffles of mesa's RandomActivation, so with the same `seed`
+    it reproduces the trajectories of PolicitalModel exactly (slower, for checks).
+
+    all_pairs sets how the "everyone with everyone" step is computed:
+    'dense' evaluates all N*(N-1) pairs, 'overlap' visits only agents with
+    overlapping opinion intervals (see overlap_changes).
+
+    With a `graph` (networks.Graph with N agents) pairwise is ignored: on every step
+    each agent meets all its neighbours and the effect of each contact is
+    multiplied on mu / degree, for the complete graph it is the all-pairs mode.
+
+    With active_set=True agents that moved by less than freeze_tol
+    (change_threshold / N by default) for freeze_after steps in a row are frozen:
+    they still influence others but are not updated, and pairs of two frozen
+    agents are skipped. A frozen agent is woken up as soon as an agent that
+    moved lands in its interval [x - u, x + u]. This is an approximation: the
+    skipped changes of frozen agents are small but not bounded, so y and the
+    stopping step may differ slightly from a full run, while converged runs cost
+    almost nothing. Only for the all-pairs and graph modes: in the pairwise mode
+    a few calm steps mean that the random partners didn't overlap, not that
+    the agent has converged (and a pairwise step is already O(N)).
+    """
+
+    def __init__(self, N, u=1.2, u_e=0.1, p_e=0.25, mu=0.5, delta=0, pairwise=True,
+                  max_iter = 1000, change_threshold=1e-07, conv_check_periods_num=50, seed=None,
+                  mesa_order=False, all_pairs='dense', record='full', record_stride=1, record_path=None,
+                  active_set=False, freeze_after=10, freeze_tol=None, graph=None):
+
+        assert u >= 0 and u <= 2, 'u x must be in [0, 2]'
+        assert u_e >= 0 and u_e <= 2, 'u_e x must be in [0, 2]'
+        assert p_e >= 0 and p_e <= 1, 'p_e x must be in [0, 1]'
+        assert N % 2 == 0 or graph is not None, 'N has to be even'
+        assert graph is None or graph.n == N, 'graph must have N agents'
+        assert all_pairs in ('dense', 'overlap'), "all_pairs must be 'dense' or 'overlap'"
+        assert not (active_set and pairwise and graph is None), 'active_set needs pairwise=False or a graph'
+
+        # global numpy state by default, the same as the object model
+        self.rng = np.random if seed is None else np.random.RandomState(seed)
+
+        # order of the agents in mesa's scheduler, shuffled on every step
+        self.mesa_order = mesa_order
+        if self.mesa_order:
+            self.random = random.Random(seed if seed is not None else random.random())
+            self.order = list(range(N))
+
+        self.num_agents = N
+        self.u_init = u
+        self.u_e = u_e # extremists uncertainty lvl
+        self.p_e = p_e # extr share
+        self.mu = mu
+        self.delta = delta
+        self.pairwise = pairwise # random pairs on each step if True, 1 vs all otherwise
+        self.all_pairs = all_pairs
+        self.graph = graph
+
+        if self.graph is not None:
+            self.mu_fact_coef = self.mu / np.maximum(self.graph.degree, 1)
+        else:
+            self.mu_fact_coef = self.mu if self.pairwise else self.mu / (self.num_agents - 1)
+
+        x_array = self.rng.uniform(-1, 1, self.num_agents)
+
+        p_pos_div_p_neg = (1 + self.delta) / (1 - self.delta)
+        p_neg = self.p_e / (1 + p_pos_div_p_neg)
+        p_pos = self.p_e - p_neg
+
+        self.P_NEG_BOUND = np.quantile(x_array, p_neg)
+        self.P_POS_BOUND = np.quantile(x_array, 1 - p_pos)
+
+        self.extremist = (x_array < self.P_NEG_BOUND) | (x_array > self.P_POS_BOUND)
+
+        self.initial_x = x_array.copy()
+        self.x = x_array # opinions
+        self.u = np.where(self.extremist, self.u_e, self.u_init) # uncertainty lvls
+
+        self.steps = 0
+        self.recorder = TrajectoryRecorder(self.num_agents, max_iter, mode=record,
+                                           stride=record_stride, path=record_path)
+        self.recorder.record(self.steps, self.x)
+
+        self.step_sum_change = 0
+        self.step_sum_change_history = []
+
+        # stopping parameters
+        self.max_iter = max_iter
+        self.change_threshold = change_threshold
+        self.conv_check_periods_num = conv_check_periods_num
+        self.check_change_list = deque(maxlen=self.conv_check_periods_num)
+        self.run_iters = 0
+
+        # agents updated on each step
+        self.active_set = active_set
+        self.active = np.ones(self.num_agents, dtype=bool)
+        self.freeze_after = freeze_after
+        self.freeze_tol = change_threshold / N if freeze_tol is None else freeze_tol
+        self.calm_steps = np.zeros(self.num_agents, dtype=int) # steps without changes in a row
+
+    def calculate_changes(self, order=None, receivers=None):
+        """Returns x and u changes of all agents (or only of `receivers`) for one step"""
+
+        if self.graph is not None:
+            dx, du, _ = graph_changes(self.x, self.u, self.mu_fact_coef, self.graph, receivers)
+        elif self.pairwise:
+            # the same draw as np.random.choice over the agents list
+            pairs = self.rng.choice(self.num_agents, size=(self.num_agents // 2, 2), replace=False)
+            if order is not None:
+                pairs = order[pairs]
+            dx, du, _ = matching_changes(self.x, self.u, pairs, self.mu_fact_coef)
+        elif self.all_pairs == 'overlap':
+            dx, du, _ = overlap_changes(self.x, self.u, self.mu_fact_coef, receivers)
+        else:
+            dx, du, _ = all_pairs_changes(self.x, self.u, self.mu_fact_coef, order, receivers)
+
+        return dx, du
+
+    def step(self):
+        """Advance the model by one step."""
+
+        order = np.array(self.order) if self.mesa_order else None
+
+        if self.active_set:
+            self.step_active(order)
+        else:
+            dx, du = self.calculate_changes(order)
+
+            self.step_sum_change = np.sum(np.abs(dx if order is None else dx[order]))
+
+            # apply changes
+            self.x = np.clip(self.x + dx, -1, 1)
+            self.u = self.u + du
+
+        self.check_change_list.append(self.step_sum_change)
+        self.step_sum_change_history.append(self.step_sum_change)
+
+        self.steps += 1
+        self.recorder.record(self.steps, self.x)
+
+        if self.mesa_order:
+            self.random.shuffle(self.order)
+
+    def step_active(self, order=None):
+        """Step of the active agents only, then freezes calm agents and wakes up disturbed ones"""
+
+        receivers = np.flatnonzero(self.active)
+        if order is not None:
+            receivers = order[self.active[order]]
+
+        if len(receivers) == 0:
+            # everything is frozen, nothing can move anymore
+            self.step_sum_change = 0
+            return
+
+        dx, du = self.calculate_changes(order, receivers)
+        dx, du = dx[receivers], du[receivers]
+
+        self.step_sum_change = np.sum(np.abs(dx))
+
+        self.x = self.x.copy()
+        self.x[receivers] = np.clip(self.x[receivers] + dx, -1, 1)
+        self.u = self.u.copy()
+        self.u[receivers] += du
+
+        moved = (np.abs(dx) > self.freeze_tol) | (np.abs(du) > self.freeze_tol)
+        self.calm_steps[receivers] = np.where(moved, 0, self.calm_steps[receivers] + 1)
+        self.active[receivers[self.calm_steps[receivers] >= self.freeze_after]] = False
+
+        movers = receivers[moved]
+        frozen = np.flatnonzero(~self.active)
+        if len(movers) == 0 or len(frozen) == 0:
+            return
+
+        # a mover can influence a frozen agent i only if |x_mover - x_i| < u_i
+        movers_x = np.sort(self.x[movers])
+        lo = np.searchsorted(movers_x, self.x[frozen] - self.u[frozen], side='right')
+        hi = np.searchsorted(movers_x, self.x[frozen] + self.u[frozen], side='left')
+
+        woken = frozen[hi > lo]
+        self.active[woken] = True
+        self.calm_steps[woken] = 0
+
+    def run(self):
+        """Run until max_iter or stopping condition is achieved"""
+
+        for i in range(self.max_iter):
+
+            self.step()
+
+            self.run_iters += 1
+
+            if len(self.check_change_list)==self.conv_check_periods_num and \
+            max(self.check_change_list) < self.change_threshold:
+                break
+
+        self.recorder.record_final(self.steps, self.x)
+
+    def like_extremist(self):
+        """-1 / 1 for agents beyond the negative / positive bound, 0 otherwise"""
+
+        return (self.x >= self.P_POS_BOUND).astype(int) - (self.x <= self.P_NEG_BOUND).astype(int)
+
+    def get_current_agents(self):
+        return pd.DataFrame({'X': self.x, 'Extremist': self.like_extremist(),
+                             'Initial_extremist': self.extremist})
+
+    def get_y(self):
+        """Returns y = p_e_neg**2 + p_e_pos**2 """
+
+        return stats.get_y(self.x, self.P_NEG_BOUND, self.P_POS_BOUND)
+
+    def get_extremist_shares(self):
+        """Shares of agents with like_extremist() == -1 and == 1"""
+
+        return stats.extremist_shares(self.x, self.P_NEG_BOUND, self.P_POS_BOUND)
+
+    def get_clusters(self, tol=0.01):
+        """Centres and sizes of opinion clusters, see stats.clusters"""
+
+        return stats.clusters(self.x, tol)
+
+    def plot_dynamics(self):
+
+        self.recorder.to_frame().plot(legend=False)
+        plt.show();
@@ -0,0 +1,190 @@
+import numpy as np
+
+from array_model import ArrayPoliticalModel
+
+
+PARAMS = ['N', 'u', 'u_e', 'p_e', 'mu', 'delta', 'pairwise',
+          'max_iter', 'change_threshold', 'conv_check_periods_num']
+
+
+def is_mesa_model(model):
+    return not isinstance(model, ArrayPoliticalModel)
+
+
+def get_params(model):
+    """Constructor parameters of PolicitalModel / ArrayPoliticalModel"""
+
+    params = {name: getattr(model, name) for name in PARAMS[2:]}
+    params['N'] = model.num_agents
+    params['u'] = model.u if is_mesa_model(model) else model.u_init
+
+    return params
+
+
+def get_state(model):
+    """Agents arrays, bounds, RNG states and the convergence counters of a model"""
+
+    state = {'P_NEG_BOUND': model.P_NEG_BOUND, 'P_POS_BOUND': model.P_POS_BOUND,
+             'check_change_list': np.array(model.check_change_list, dtype=float),
+             'run_iters': model.run_iters}
+
+    if is_mesa_model(model):
+        agents = model.agent_list
+        state['x'] = np.array([a.x for a in agents], dtype=float)
+        state['u'] = np.array([a.u for a in agents], dtype=float)
+        state['extremist'] = np.array([a.extremist for a in agents])
+        state['initial_x'] = np.array([a.initial_x for a in agents], dtype=float)
+        state['steps'] = model.schedule.steps
+        # activation order of mesa's scheduler and its python RNG
+        state['order'] = np.array([a.unique_id for a in model.schedule.agents])
+        rng, random = model.np_random, model.random
+    else:
+        for name in ['x', 'u', 'extremist', 'initial_x', 'steps', 'active', 'calm_steps']:
+            state[name] = getattr(model, name)
+        if model.mesa_order:
+            state['order'] = np.array(model.order)
+        rng, random = model.rng, getattr(model, 'random', None)
+
+    _, keys, pos, has_gauss, gauss = rng.get_state()
+    state.update(rng_keys=keys, rng_pos=pos, rng_has_gauss=has_gauss, rng_gauss=gauss)
+
+    if random is not None:
+        version, internal, gauss_next = random.getstate()
+        state['random_state'] = np.array(internal, dtype=np.int64)
+        state['random_gauss'] = np.nan if gauss_next is None else gauss_next
+
+    return state
+
+
+def set_state(model, state):
+    """Puts a state from get_state into a model with the same N"""
+
+    model.P_NEG_BOUND = float(state['P_NEG_BOUND'])
+    model.P_POS_BOUND = float(state['P_POS_BOUND'])
+    model.check_change_list.clear()
+    model.check_change_list.extend(float(i) for i in state['check_change_list'])
+    model.run_iters = int(state['run_iters'])
+
+    # the restored model continues the saved stream in its own RandomState
+    rng = np.random.RandomState()
+    rng.set_state(('MT19937', state['rng_keys'], int(state['rng_pos']),
+                   int(state['rng_has_gauss']), float(state['rng_gauss'])))
+
+    if 'random_state' in state:
+        gauss = float(state['random_gauss'])
+        random_state = (3, tuple(int(i) for i in state['random_state']),
+                        None if np.isnan(gauss) else gauss)
+
+    if is_mesa_model(model):
+        model.np_random = rng
+        for i, a in enumerate(model.agent_list):
+            a.x, a.u = float(state['x'][i]), float(state['u'][i])
+            a.extremist = bool(state['extremist'][i])
+            a.initial_x = float(state['initial_x'][i])
+        model.schedule.steps = model.schedule.time = int(state['steps'])
+        model.random.setstate(random_state)
+
+        # re-adding the agents restores the order of the scheduler
+        for unique_id in state['order']:
+            agent = model.agent_list[unique_id]
+            model.schedule.remove(agent)
+            model.schedule.add(agent)
+    else:
+        model.rng = rng
+        model.x, model.u = state['x'].copy(), state['u'].copy()
+        model.extremist, model.initial_x = state['extremist'].copy(), state['initial_x'].copy()
+        model.steps = int(state['steps'])
+        model.active, model.calm_steps = state['active'].copy(), state['calm_steps'].copy()
+        if model.mesa_order:
+            model.order = [int(i) for i in state['order']]
+            model.random.setstate(random_state)
+
+    # the recorded trajectory starts from the restored state
+    model.recorder.reset()
+    if is_mesa_model(model):
+        model.recorder.record(model.schedule.steps, model.get_x())
+    else:
+        model.recorder.record(model.steps, model.x)
+
+
+def save_checkpoint(model, path):
+    """Saves parameters and state of PolicitalModel / ArrayPoliticalModel to an .npz file"""
+
+    params = get_params(model)
+    np.savez_compressed(path, mesa=is_mesa_model(model),
+                        **{'param_' + k: v for k, v in params.items()}, **get_state(model))
+
+
+def load_checkpoint(path, **kwargs):
+    """
+    Creates a new model from save_checkpoint file, kwargs go to the constructor
+    (record, active_set, graph etc. which are not saved).
+    """
+
+    with np.load(path) as data:
+        state = {k: data[k] for k in data.files}
+
+    params = {k[len('param_'):]: state[k].item() for k in state if k.startswith('param_')}
+
+    if state['mesa']:
+        from main import PolicitalModel
+        model_cls = PolicitalModel
+    else:
+        model_cls = ArrayPoliticalModel
+        if 'order' in state:
+            kwargs.setdefault('mesa_order', True)
+
+    # a private seed so that creating the model doesn't touch the global RNG
+    model = model_cls(seed=0, **params, **kwargs)
+    set_state(model, state)
+
+    return model
+
+
+def warm_start(model, **params):
+    """
+    New model with `params` changed that starts from the current state of `model`,
+    e.g. from the converged state of a neighbouring sweep point.
+
+    Extremists are assigned again from the initial opinions, agents that keep
+    their type shift their uncertainty by the change of u (u_e),
+    agents that change it get the new initial uncertainty.
+    The convergence counters start from zero.
+    """
+
+    old = get_params(model)
+    new = dict(old, **params)
+    state = get_state(model)
+
+    kwargs = {}
+    if not is_mesa_model(model):
+        kwargs = {'all_pairs': model.all_pairs, 'active_set': model.active_set,
+                  'graph': model.graph, 'record': model.recorder.mode}
+
+    if is_mesa_model(model):
+        from main import PolicitalModel
+        next_model = PolicitalModel(seed=0, **new, record=model.recorder.mode)
+    else:
+        next_model = ArrayPoliticalModel(seed=0, mesa_order=model.mesa_order, **new, **kwargs)
+
+    # bounds and extremists of the new parameters from the same initial opinions
+    initial_x = state['initial_x']
+    p_pos_div_p_neg = (1 + new['delta']) / (1 - new['delta'])
+    p_neg = new['p_e'] / (1 + p_pos_div_p_neg)
+    p_pos = new['p_e'] - p_neg
+    state['P_NEG_BOUND'] = np.quantile(initial_x, p_neg)
+    state['P_POS_BOUND'] = np.quantile(initial_x, 1 - p_pos)
+    extremist = (initial_x < state['P_NEG_BOUND']) | (initial_x > state['P_POS_BOUND'])
+
+    u = np.where(extremist, state['u'] + new['u_e'] - old['u_e'], state['u'] + new['u'] - old['u'])
+    switched = extremist != state['extremist']
+    u[switched] = np.where(extremist, new['u_e'], new['u'])[switched]
+
+    state.update(u=u, extremist=extremist, run_iters=0, check_change_list=np.array([]))
+    if 'active' in state:
+        state['active'] = np.ones(len(u), dtype=bool)
+        state['calm_steps'] = np.zeros(len(u), dtype=int)
+
+    set_state(next_model, state)
+
+    return next_model
@@ -0,0 +1,136 @@
+import numpy as np
+import pandas as pd
+
+from array_model import matching_changes, all_pairs_changes, overlap_changes
+import stats
+
+
+class PoliticalEnsemble:
+    """
+    R independent replicas of the same PolicitalModel parameters
+    advanced together as one stacked (R, N) state.
+
+    Every replica has its own RandomState, replica r gives the same trajectory
+    as ArrayPoliticalModel(seed=seeds[r]). Converged replicas are frozen
+    and are not computed anymore.
+    """
+
+    def __init__(self, R, N, u=1.2, u_e=0.1, p_e=0.25, mu=0.5, delta=0, pairwise=True,
+                  max_iter = 1000, change_threshold=1e-07, conv_check_periods_num=50,
+                  seed=None, seeds=None, all_pairs='dense'):
+
+        assert u >= 0 and u <= 2, 'u x must be in [0, 2]'
+        assert u_e >= 0 and u_e <= 2, 'u_e x must be in [0, 2]'
+        assert p_e >= 0 and p_e <= 1, 'p_e x must be in [0, 1]'
+        assert N % 2 == 0, 'N has to be even'
+        assert all_pairs in ('dense', 'overlap'), "all_pairs must be 'dense' or 'overlap'"
+
+        if seeds is None:
+            seeds = np.random.SeedSequence(seed).generate_state(R)
+        assert len(seeds) == R, 'one seed per replica is needed'
+
+        self.num_replicas = R
+        self.num_agents = N
+        self.seeds = np.array(seeds)
+        self.rngs = [np.random.RandomState(s) for s in self.seeds]
+
+        self.u_init = u
+        self.u_e = u_e # extremists uncertainty lvl
+        self.p_e = p_e # extr share
+        self.mu = mu
+        self.delta = delta
+        self.pairwise = pairwise
+        self.all_pairs = all_pairs
+
+        self.mu_fact_coef = self.mu if self.pairwise else self.mu / (self.num_agents - 1)
+
+        x_array = np.array([rng.uniform(-1, 1, N) for rng in self.rngs])
+
+        p_pos_div_p_neg = (1 + self.delta) / (1 - self.delta)
+        p_neg = self.p_e / (1 + p_pos_div_p_neg)
+        p_pos = self.p_e - p_neg
+
+        # bounds of every replica, shape (R, 1)
+        self.P_NEG_BOUND = np.quantile(x_array, p_neg, axis=1, keepdims=True)
+        self.P_POS_BOUND = np.quantile(x_array, 1 - p_pos, axis=1, keepdims=True)
+
+        self.extremist = (x_array < self.P_NEG_BOUND) | (x_array > self.P_POS_BOUND)
+
+        self.x = x_array
+        self.u = np.where(self.extremist, self.u_e, self.u_init)
+
+        # stopping parameters, a ring buffer of step_sum_change per replica
+        self.max_iter = max_iter
+        self.change_threshold = change_threshold
+        self.conv_check_periods_num = conv_check_periods_num
+        self.check_change = np.full((R, conv_check_periods_num), np.inf)
+
+        self.run_iters = np.zeros(R, dtype=int)
+        self.converged = np.zeros(R, dtype=bool)
+
+    def calculate_changes(self, active):
+        """Returns x and u changes of the active replicas, shape (len(active), N)"""
+
+        N = self.num_agents
+        x, u = self.x[active], self.u[active]
+
+        if self.pairwise:
+            # each replica draws its own matching, indices are shifted into the flat state
+            pairs = np.concatenate([
+                self.rngs[r].choice(N, size=(N // 2, 2), replace=False) + i * N
+                for i, r in enumerate(active)
+            ])
+            dx, du, _ = matching_changes(x.ravel(), u.ravel(), pairs, self.mu_fact_coef)
+            return dx.reshape(x.shape), du.reshape(u.shape)
+
+        changes = overlap_changes if self.all_pairs == 'overlap' else all_pairs_changes
+
+        dx, du = np.zeros_like(x), np.zeros_like(u)
+        for i in range(len(active)):
+            dx[i], du[i], _ = changes(x[i], u[i], self.mu_fact_coef)
+
+        return dx, du
+
+    def step(self):
+        """Advance all not converged replicas by one step."""
+
+        active = np.flatnonzero(~self.converged)
+        if len(active) == 0:
+            return
+
+        dx, du = self.calculate_changes(active)
+
+        step_sum_change = np.abs(dx).sum(axis=1)
+
+        self.x[active] = np.clip(self.x[active] + dx, -1, 1)
+        self.u[active] = self.u[active] + du
+
+        self.check_change[active, self.run_iters[active] % self.conv_check_periods_num] = step_sum_change
+        self.run_iters[active] += 1
+
+        # the same stopping rule as PolicitalModel.run
+        self.converged[active] = (
+            (self.run_iters[active] >= self.conv_check_periods_num)
+            & (self.check_change[active].max(axis=1) < self.change_threshold)
+        )
+
+    def run(self):
+        """Run until every replica converged or max_iter is achieved"""
+
+        for i in range(self.max_iter):
+
+            self.step()
+
+            if self.converged.all():
+                break
+
+        return self.get_results()
+
+    def get_y(self):
+        """Returns y = p_e_neg**2 + p_e_pos**2 of every replica"""
+
+        return stats.get_y(self.x, self.P_NEG_BOUND, self.P_POS_BOUND)
+
+    def get_results(self):
+        return pd.DataFrame({'seed': self.seeds, 'y': self.get_y(),
+                             'run_iters': self.run_iters, 'converged': self.converged})
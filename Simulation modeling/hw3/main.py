@@ -6,6 +6,10 @@ from collections import deque
 import pandas as pd
 import matplotlib.pyplot as plt
 
+from recorder import TrajectoryRecorder
+from profiling import StepProfiler, NullProfiler
+import stats
+
 class PoliticalAgent(Agent):
     """An agent with fixed initial wealth."""
 
@@ -59,7 +63,9 @@ class PolicitalModel(Model):
     """An absolutely theoretical model"""
 
     def __init__(self, N, u=1.2, u_e=0.1, p_e=0.25, mu=0.5, delta=0, pairwise=True,
-                  max_iter = 1000, change_threshold=1e-07, conv_check_periods_num=50):
+                  max_iter = 1000, change_threshold=1e-07, conv_check_periods_num=50, seed=None,
+                  record='full', record_stride=1, record_path=None, profile=False):
+        # seed is also picked up by mesa for the activation order
         super().__init__()
 
         assert u >= 0 and u <= 2, 'u x must be in [0, 2]'
@@ -68,6 +74,9 @@ class PolicitalModel(Model):
         assert N % 2 == 0, 'N has to be even'
         
         
+        # global numpy state unless the seed is fixed
+        self.np_random = np.random if seed is None else np.random.RandomState(seed)
+
         self.num_agents = N
         self.schedule = mesa.time.RandomActivation(self)
         self.u = u
@@ -82,7 +91,7 @@ class PolicitalModel(Model):
         self.mu_fact_coef = self.mu if self.pairwise else self.mu / (self.num_agents - 1)
 
         # Creating agents 
-        x_array = np.random.uniform(-1, 1, self.num_agents)
+        x_array = self.np_random.uniform(-1, 1, self.num_agents)
 
         # suppose p_pos >= p_neg since we don't dif. extremist type
         # (discussed at the seminar)
@@ -94,7 +103,8 @@ class PolicitalModel(Model):
         self.P_NEG_BOUND = np.quantile(x_array, p_neg)
         self.P_POS_BOUND = np.quantile(x_array, 1 - p_pos)
 
-        # Create agents
+        # Create agents, the list keeps the creation order (scheduler shuffles its own)
+        self.agent_list = []
         for i, x in enumerate(x_array):
             if x < self.P_NEG_BOUND:
                 a = PoliticalAgent(i, self, x, self.u_e, extremist=True)
@@ -104,9 +114,13 @@ class PolicitalModel(Model):
                 a = PoliticalAgent(i, self, x, self.u)
             # Add the agent to the scheduler
             self.schedule.add(a)
+            self.agent_list.append(a)
 
-        self.datacollector = mesa.datacollection.DataCollector(agent_reporters={"X": "x"})
-        self.datacollector.collect(self)
+        # opinions over time, see TrajectoryRecorder for the modes
+        self.recorder = TrajectoryRecorder(self.num_agents, max_iter, mode=record,
+                                           stride=record_stride, path=record_path)
+        if self.recorder.due(self.schedule.steps):
+            self.recorder.record(self.schedule.steps, self.get_x())
 
         self.step_sum_change = 0
         self.model_datacollector = mesa.datacollection.DataCollector(model_reporters={"Step_sum_change": "step_sum_change"})
@@ -118,6 +132,9 @@ class PolicitalModel(Model):
         self.check_change_list = deque(maxlen=self.conv_check_periods_num)
         self.run_iters = 0
 
+        # per-phase timings of steps, see get_profile
+        self.profiler = StepProfiler() if profile else NullProfiler()
+
     def calculate_pair_update(self, first: PoliticalAgent, second: PoliticalAgent):
 
         h_ij = min(first.x + first.u, second.x + second.u) - max(first.x - first.u, second.x - second.u)
@@ -131,34 +148,61 @@ class PolicitalModel(Model):
 
             first.x_change += self.mu_fact_coef * (h_ij / second.u - 1) * (second.x - first.x)
             first.u_change += self.mu_fact_coef * (h_ij / second.u - 1) * (second.u - first.u)
-            
+
+        # True if the pair had an effect
+        return h_ij > first.u or h_ij > second.u
         
     def step(self):
         """Advance the model by one step."""
 
+        # a NullProfiler unless profile=True, so the timed step is the production one
+        profiler = self.profiler
+        profiler.start_step()
+
         if self.pairwise:
             # generates random pairs of agents to affect each other
-            pairs = np.random.choice(
+            pairs = self.np_random.choice(
                 self.schedule.agents, size=(int(self.num_agents / 2), 2),replace=False
             )
 
         else: 
             # generates all possible unique pairs between agents
             pairs = combinations(self.schedule.agents, 2)
+        profiler.lap('pairs')
 
+        pairs_effective = 0
         for a1, a2 in pairs:
-            self.calculate_pair_update(a1, a2)  
+            pairs_effective += self.calculate_pair_update(a1, a2)
+        profiler.lap('updates')
 
         self.step_sum_change = np.sum([abs(i.x_change) for i in self.schedule.agents])
 
         self.check_change_list.append(self.step_sum_change)
+        profiler.lap('sum_change')
+
+        if profiler.enabled:
+            agents_changed = sum(1 for i in self.schedule.agents if i.x_change or i.u_change)
+            profiler.skip()
 
         self.model_datacollector.collect(self) # collect changes for statistics 
+        profiler.lap('collect')
 
         self.schedule.step() # apply changes 
+        profiler.lap('apply')
+
+        if self.recorder.due(self.schedule.steps):
+            self.recorder.record(self.schedule.steps, self.get_x()) # collect agents data
+        profiler.lap('record')
+
+        if profiler.enabled:
+            n = self.num_agents
+            profiler.end_step(pairs_evaluated=n // 2 if self.pairwise else n * (n - 1) // 2,
+                              pairs_effective=pairs_effective, agents_changed=agents_changed)
 
-        self.datacollector.collect(self) # collect agents data
+    def get_profile(self):
+        """Summary of step timings after run(), None if the model was created without profile=True"""
 
+        return self.profiler.summary() if self.profiler.enabled else None
 
     def run(self):
         """Run until max_iter or stopping condition is achieved"""
@@ -173,24 +217,46 @@ class PolicitalModel(Model):
             max(self.check_change_list) < self.change_threshold:
                 break
 
-    
+        if self.recorder.mode != 'off':
+            self.recorder.record_final(self.schedule.steps, self.get_x())
+
+    def get_x(self):
+        """Current opinions in the order of agents creation"""
+        return np.fromiter((a.x for a in self.agent_list), dtype=float, count=self.num_agents)
+
     def get_current_agents(self):
-        return (
-            pd.DataFrame([(i.x, i.like_extremist(), i.extremist) for i in self.agents],
-                          columns=['X', 'Extremist', 'Initial_extremist'])
-        )
+
+        # the recorder already holds the current state unless steps were made without recording
+        if self.recorder.last_step == self.schedule.steps:
+            x = self.recorder.last
+        else:
+            x = self.get_x()
+
+        return pd.DataFrame({
+            'X': x,
+            'Extremist': (x >= self.P_POS_BOUND).astype(int) - (x <= self.P_NEG_BOUND).astype(int),
+            'Initial_extremist': [a.extremist for a in self.agent_list],
+        })
 
 
     def get_y(self):
         """Returns y = p_e_neg**2 + p_e_pos**2 """
 
-        df = self.get_current_agents()['Extremist'].value_counts(normalize=True).to_dict()
+        return stats.get_y(self.get_x(), self.P_NEG_BOUND, self.P_POS_BOUND)
+
+    def get_extremist_shares(self):
+        """Shares of agents with like_extremist() == -1 and == 1"""
+
+        return stats.extremist_shares(self.get_x(), self.P_NEG_BOUND, self.P_POS_BOUND)
+
+    def get_clusters(self, tol=0.01):
+        """Centres and sizes of opinion clusters, see stats.clusters"""
 
-        return df.get(-1, 0)**2 + df.get(1, 0)**2 
+        return stats.clusters(self.get_x(), tol)
 
 
     def plot_dynamics(self):
 
-        data = self.datacollector.get_agent_vars_dataframe().T.stack().T
+        data = self.recorder.to_frame()
         data.plot(legend=False)
         plt.show();
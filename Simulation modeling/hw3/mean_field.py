@@ -0,0 +1,178 @@
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from array_model import overlap_changes
+import stats
+
+
+class MeanFieldModel:
+    """
+    Infinite-population limit of PolicitalModel in the "everyone with everyone" regime.
+
+    The joint density of (x, u) is a set of mass points: at start the opinion axis
+    is cut into nx cells and every cell gets its moderate or extremist mass.
+    Each point moves with the mean drift of the relative agreement rule
+    (mu / (N-1) times the sum over the others -> mu times the mass-weighted mean),
+    points that meet are merged. Moderate and extremist masses are kept apart.
+    The cost depends on nx, not on the population size.
+
+    Moving mass points instead of re-depositing mass on a fixed grid every step
+    keeps the clusters sharp, with re-gridding the mass of a cluster spreads
+    over the neighbouring cells and never settles.
+    """
+
+    def __init__(self, u=1.2, u_e=0.1, p_e=0.25, mu=0.5, delta=0, nx=400,
+                  max_iter=1000, change_threshold=1e-07, conv_check_periods_num=50, merge_tol=1e-09):
+
+        assert u > 0 and u <= 2, 'u x must be in (0, 2]'
+        assert u_e > 0 and u_e <= 2, 'u_e x must be in (0, 2]'
+        assert p_e >= 0 and p_e <= 1, 'p_e x must be in [0, 1]'
+
+        self.u_init = u
+        self.u_e = u_e
+        self.p_e = p_e
+        self.mu = mu
+        self.delta = delta
+        self.nx = nx
+        self.merge_tol = merge_tol
+
+        p_pos_div_p_neg = (1 + self.delta) / (1 - self.delta)
+        p_neg = self.p_e / (1 + p_pos_div_p_neg)
+        p_pos = self.p_e - p_neg
+
+        # quantiles of the uniform initial opinions
+        self.P_NEG_BOUND = -1 + 2 * p_neg
+        self.P_POS_BOUND = 1 - 2 * p_pos
+
+        points = [
+            self.segment(-1, self.P_NEG_BOUND, u_e, True),
+            self.segment(self.P_NEG_BOUND, self.P_POS_BOUND, u, False),
+            self.segment(self.P_POS_BOUND, 1, u_e, True),
+        ]
+        self.x, self.u, self.mass, self.mass_e = map(np.concatenate, zip(*points))
+
+        self.step_sum_change = 0
+        self.max_iter = max_iter
+        self.change_threshold = change_threshold
+        self.conv_check_periods_num = conv_check_periods_num
+        self.check_change_list = deque(maxlen=self.conv_check_periods_num)
+        self.run_iters = 0
+
+    def segment(self, low, high, u, extremist):
+        """Mass points in the midpoints of the cells of [low, high]"""
+
+        n = int(round((high - low) / 2 * self.nx))
+        if n == 0:
+            return (np.empty(0),) * 4
+
+        edges = np.linspace(low, high, n + 1)
+        mass = np.full(n, (high - low) / 2 / n)
+        zeros = np.zeros(n)
+
+        return ((edges[1:] + edges[:-1]) / 2, np.full(n, u),
+                zeros if extremist else mass, mass if extremist else zeros)
+
+    @property
+    def weights(self):
+        return self.mass + self.mass_e
+
+    def calculate_changes(self):
+        """
+        Mean drift of every mass point, influence of each point is weighted by its mass.
+        Only points with overlapping intervals are visited (see overlap_changes),
+        a point doesn't move itself.
+        """
+
+        dx, du, _ = overlap_changes(self.x, self.u, self.mu, weights=self.weights)
+        return dx, du
+
+    def merge(self):
+        """Merges mass points closer than merge_tol in both x and u"""
+
+        order = np.lexsort((self.u, self.x))
+        x, u = self.x[order], self.u[order]
+
+        new = np.concatenate([[True], (np.diff(x) > self.merge_tol) | (np.abs(np.diff(u)) > self.merge_tol)])
+        if new.all():
+            return
+
+        starts = np.flatnonzero(new)
+        mass, mass_e = self.mass[order], self.mass_e[order]
+        weights = mass + mass_e
+
+        total = np.add.reduceat(weights, starts)
+        self.x = np.add.reduceat(x * weights, starts) / total
+        self.u = np.add.reduceat(u * weights, starts) / total
+        self.mass = np.add.reduceat(mass, starts)
+        self.mass_e = np.add.reduceat(mass_e, starts)
+
+    def step(self):
+
+        dx, du = self.calculate_changes()
+
+        # mean absolute change of opinion per unit of mass
+        self.step_sum_change = np.sum(self.weights * np.abs(dx))
+        self.check_change_list.append(self.step_sum_change)
+
+        self.x = np.clip(self.x + dx, -1, 1)
+        self.u = self.u + du
+
+        self.merge()
+
+    def run(self):
+        """Run until max_iter or stopping condition is achieved"""
+
+        for i in range(self.max_iter):
+
+            self.step()
+
+            self.run_iters += 1
+
+            if len(self.check_change_list)==self.conv_check_periods_num and \
+            max(self.check_change_list) < self.change_threshold:
+                break
+
+        return self
+
+    def get_extremist_shares(self):
+        """Mass at or beyond the negative / positive bound"""
+
+        weights = self.weights
+        return (weights[self.x <= self.P_NEG_BOUND].sum(), weights[self.x >= self.P_POS_BOUND].sum())
+
+    def get_y(self):
+        """Returns y = p_e_neg**2 + p_e_pos**2 """
+
+        p_neg, p_pos = self.get_extremist_shares()
+        return p_neg**2 + p_pos**2
+
+    def get_clusters(self, tol=0.01):
+        """Centres and masses of opinion clusters, see stats.clusters"""
+
+        return stats.clusters(self.x, tol, weights=self.weights)
+
+    def get_density(self, bins=100, extremists=None):
+        """
+        Density of opinions on `bins` cells of [-1, 1]. extremists=True / False
+        gives only the initially extremist / moderate mass.
+        """
+
+        weights = {None: self.weights, True: self.mass_e, False: self.mass}[extremists]
+        density, edges = np.histogram(self.x, bins=bins, range=(-1, 1), weights=weights, density=False)
+
+        return pd.Series(density / np.diff(edges), index=(edges[1:] + edges[:-1]) / 2)
+
+
+def phase_diagram(u_values, p_e_values, **kwargs):
+    """y of MeanFieldModel on the grid of u and p_e, u in rows and p_e in columns"""
+
+    res = pd.DataFrame(index=pd.Index(u_values, name='u'), columns=pd.Index(p_e_values, name='p_e'),
+                       dtype=float)
+
+    for u in u_values:
+        for p_e in p_e_values:
+            res.loc[u, p_e] = MeanFieldModel(u=u, p_e=p_e, **kwargs).run().get_y()
+
+    return res
@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+
+
+class Graph:
+    """
+    Interaction network in CSR form: neighbours of agent i are
+    indices[indptr[i]:indptr[i + 1]].
+    """
+
+    def __init__(self, indptr, indices, n):
+        self.indptr = indptr
+        self.indices = indices
+        self.n = n
+
+    @property
+    def degree(self):
+        return np.diff(self.indptr)
+
+    @property
+    def num_edges(self):
+        """Number of directed edges (an undirected edge counts twice)"""
+        return len(self.indices)
+
+    def __str__(self):
+        return f"Graph: n={self.n}, directed edges={self.num_edges}"
+
+
+def from_edges(src, dst, n=None, directed=False):
+    """
+    CSR graph from arrays of edge ends. Self-loops and duplicates are dropped,
+    undirected edges are stored in both directions.
+    In a directed graph row i holds the agents influencing i (src -> dst).
+    """
+
+    src, dst = np.asarray(src, dtype=np.int64), np.asarray(dst, dtype=np.int64)
+    n = int(max(src.max(), dst.max())) + 1 if n is None else n
+
+    if not directed:
+        src, dst = np.concatenate([src, dst]), np.concatenate([dst, src])
+
+    keep = src != dst
+    # sorted unique keys give rows by receiver and neighbours in ascending order
+    keys = np.unique(dst[keep] * n + src[keep])
+    rows, cols = keys // n, keys % n
+
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+
+    index_dtype = np.int32 if n < 2**31 else np.int64
+    return Graph(indptr, cols.astype(index_dtype), n)
+
+
+def from_edge_list(path, n=None, directed=False):
+    """
+    Graph from a file with two columns of agent ids (whitespace separated,
+    '#' comments) or from an .npy array of shape (E, 2).
+    """
+
+    if str(path).endswith('.npy'):
+        edges = np.load(path)
+    else:
+        edges = pd.read_csv(path, sep=r'\s+', header=None, comment='#', usecols=[0, 1]).values
+
+    return from_edges(edges[:, 0], edges[:, 1], n=n, directed=directed)
+
+
+def ring_edges(n, k):
+    """Every agent connected to k / 2 neighbours on each side of a ring"""
+
+    assert k % 2 == 0 and 0 < k < n, 'k has to be even and less than n'
+
+    src = np.repeat(np.arange(n), k // 2)
+    dst = (src + np.tile(np.arange(1, k // 2 + 1), n)) % n
+
+    return src, dst
+
+
+def k_regular(n, k):
+    """k-regular ring lattice"""
+
+    return from_edges(*ring_edges(n, k), n=n)
+
+
+def small_world(n, k, p, seed=None):
+    """Watts-Strogatz graph: ring lattice with every edge rewired with probability p"""
+
+    rng = np.random.default_rng(seed)
+    src, dst = ring_edges(n, k)
+
+    rewire = rng.random(len(src)) < p
+    dst = dst.copy()
+    dst[rewire] = rng.integers(0, n, rewire.sum())
+
+    return from_edges(src, dst, n=n)
+
+
+def scale_free(n, m, seed=None):
+    """
+    Barabasi-Albert graph, every new agent attaches m edges preferentially to degree.
+
+    Vectorized Batagelj-Brandes algorithm: the k-th edge goes from agent k // m
+    to the end of a uniformly chosen earlier edge slot, the chains of references
+    are resolved by pointer jumping.
+    """
+
+    rng = np.random.default_rng(seed)
+
+    k = np.arange(n * m)
+    # slot 2k holds k // m, slot 2k + 1 copies a random slot in [0, 2k]
+    target = (rng.random(n * m) * (2 * k + 1)).astype(np.int64)
+
+    odd = target % 2 == 1
+    while odd.any():
+        target[odd] = target[(target[odd] - 1) // 2]
+        odd = target % 2 == 1
+
+    return from_edges(k // m, target // 2 // m, n=n)
@@ -0,0 +1,76 @@
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+
+
+class StepProfiler:
+    """
+    Wall time of every phase of PolicitalModel.step and counts of work per step:
+    pairs evaluated, pairs that had an effect and agents that changed.
+    In the all-pairs mode the pairs are generated lazily, so their cost is a part of 'updates'.
+    """
+
+    PHASES = ['pairs', 'updates', 'sum_change', 'collect', 'apply', 'record']
+    COUNTS = ['pairs_evaluated', 'pairs_effective', 'agents_changed']
+
+    enabled = True
+
+    def __init__(self):
+        self.rows = []
+        self.current = None
+
+    def start_step(self):
+        self.current = {}
+        self.last_time = perf_counter()
+
+    def lap(self, phase):
+        """Time since the previous lap goes to `phase`"""
+
+        now = perf_counter()
+        self.current[phase] = now - self.last_time
+        self.last_time = now
+
+    def skip(self):
+        """Time since the previous lap isn't counted (e.g. computing the counts)"""
+        self.last_time = perf_counter()
+
+    def end_step(self, **counts):
+        self.current.update(counts)
+        self.rows.append(self.current)
+
+    def get_steps(self):
+        """Times (seconds) and counts of every step"""
+        return pd.DataFrame(self.rows, columns=self.PHASES + self.COUNTS)
+
+    def summary(self):
+        """
+        Total and mean per step of every phase time (seconds) and of every count,
+        share is the part of the step time taken by a phase.
+        """
+
+        steps = self.get_steps()
+        times = steps[self.PHASES]
+
+        summary = pd.DataFrame({'total': steps.sum(), 'mean_per_step': steps.mean()})
+        summary['share'] = times.sum() / max(times.values.sum(), np.finfo(float).tiny)
+
+        return summary
+
+
+class NullProfiler:
+    """Profiler of a model without profile=True, every call does nothing"""
+
+    enabled = False
+
+    def start_step(self):
+        pass
+
+    def lap(self, phase):
+        pass
+
+    def skip(self):
+        pass
+
+    def end_step(self, **counts):
+        pass
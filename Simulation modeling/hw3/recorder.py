@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+
+
+class TrajectoryRecorder:
+    """
+    Opinions of all agents over time in a preallocated float32 (steps, N) array.
+
+    mode:
+        'full' - every `stride`-th step is stored
+        'final' - only the final state (see record_final)
+        'off' - nothing is stored
+    With `path` the trajectory is kept in a memory-mapped .npy file
+    (sized for max_steps, rows after n_rows are unused).
+    """
+
+    def __init__(self, n_agents, max_steps, mode='full', stride=1, path=None):
+
+        assert mode in ('full', 'final', 'off'), "mode must be 'full', 'final' or 'off'"
+        assert stride >= 1, 'stride must be positive'
+
+        self.n_agents = n_agents
+        self.mode = mode
+        self.stride = stride
+        self.path = path
+
+        # the latest state passed to the recorder (not a copy)
+        self.last = None
+        self.last_step = None
+
+        self.n_rows = 0
+        self.data = None
+        self.steps = None
+
+        if self.mode == 'full':
+            # + rows for the initial and the final states
+            rows = max_steps // stride + 2
+            if path is None:
+                self.data = np.empty((rows, n_agents), dtype=np.float32)
+            else:
+                self.data = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32,
+                                                      shape=(rows, n_agents))
+            self.steps = np.empty(rows, dtype=np.int64)
+
+    def due(self, step):
+        """True if the state of `step` is stored, so callers can skip building it otherwise"""
+        return self.mode == 'full' and step % self.stride == 0
+
+    def record(self, step, x):
+
+        if self.mode != 'full':
+            return
+
+        self.last, self.last_step = x, step
+
+        if step % self.stride == 0:
+            self.store(step, x)
+
+    def record_final(self, step, x):
+        """Final state of a run, the only one stored in the 'final' mode"""
+
+        if self.mode == 'off':
+            return
+
+        if self.mode == 'full':
+            self.last, self.last_step = x, step
+            # with stride > 1 the final step may be skipped by record
+            if self.n_rows == 0 or self.steps[self.n_rows - 1] != step:
+                self.store(step, x)
+            return
+
+        self.last, self.last_step = np.array(x, dtype=float), step
+
+    def store(self, step, x):
+
+        if self.n_rows == len(self.data):
+            if self.path is not None:
+                raise IndexError(f'{self.path} is full, increase max_steps')
+            # more steps than planned, grow in memory
+            self.data = np.concatenate([self.data, np.empty_like(self.data)])
+            self.steps = np.concatenate([self.steps, np.empty_like(self.steps)])
+
+        self.data[self.n_rows] = x
+        self.steps[self.n_rows] = step
+        self.n_rows += 1
+
+    def reset(self):
+        """Forgets the recorded states"""
+
+        self.last, self.last_step = None, None
+        self.n_rows = 0
+
+    @property
+    def trajectory(self):
+        """Recorded states, shape (recorded steps, N)"""
+
+        if self.mode == 'full':
+            return self.data[:self.n_rows]
+        if self.last is None:
+            return np.empty((0, self.n_agents), dtype=np.float32)
+        return self.last[None].astype(np.float32)
+
+    def to_frame(self):
+        """Trajectory as a DataFrame, steps in rows and agents in columns"""
+
+        if self.mode == 'full':
+            index = self.steps[:self.n_rows]
+        else:
+            index = [] if self.last is None else [self.last_step]
+
+        return pd.DataFrame(self.trajectory, index=pd.Index(index, name='Step'))
+
+    def flush(self):
+        if isinstance(self.data, np.memmap):
+            self.data.flush()
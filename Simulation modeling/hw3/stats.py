@@ -0,0 +1,43 @@
+import numpy as np
+
+
+def extremist_shares(x, neg_bound, pos_bound):
+    """
+    Shares of agents at or beyond the bounds (like_extremist == -1 / 1).
+    Works along the last axis, so a stacked (R, N) state with (R, 1) bounds is fine too.
+    """
+
+    p_neg = np.mean(x <= neg_bound, axis=-1)
+    p_pos = np.mean(x >= pos_bound, axis=-1)
+
+    return p_neg, p_pos
+
+
+def get_y(x, neg_bound, pos_bound):
+    """y = p_e_neg**2 + p_e_pos**2"""
+
+    p_neg, p_pos = extremist_shares(x, neg_bound, pos_bound)
+
+    return p_neg**2 + p_pos**2
+
+
+def clusters(x, tol=0.01, weights=None):
+    """
+    Clusters of opinions: sorted opinions are split where the gap between
+    neighbours is larger than tol. O(N log N).
+
+    Returns centres (weighted means) and sizes (number of agents or sum of weights).
+    """
+
+    x = np.asarray(x, dtype=float)
+    weights = np.ones(len(x)) if weights is None else np.asarray(weights, dtype=float)
+
+    order = np.argsort(x, kind='stable')
+    x, weights = x[order], weights[order]
+
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(x) > tol) + 1])
+
+    sizes = np.add.reduceat(weights, starts)
+    centres = np.add.reduceat(x * weights, starts) / np.where(sizes > 0, sizes, 1)
+
+    return centres, sizes
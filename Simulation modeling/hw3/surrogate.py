@@ -0,0 +1,190 @@
+import numpy as np
+import pandas as pd
+
+from sweep import run_sweep, read_done_points
+
+
+class GaussianProcess:
+    """
+    GP regression with an isotropic RBF kernel on inputs scaled to [0, 1].
+    Length scale and noise are picked by the marginal likelihood on a small grid.
+    """
+
+    LENGTH_SCALES = [0.1, 0.2, 0.3, 0.5, 0.8]
+    NOISE_SHARES = [1e-4, 1e-3, 1e-2, 1e-1]
+
+    def kernel(self, a, b):
+        d2 = ((a[:, None, :] - b[None, :, :])**2).sum(axis=2)
+        return self.signal * np.exp(-0.5 * d2 / self.length_scale**2)
+
+    def fit(self, X, y):
+
+        self.X = np.asarray(X, dtype=float)
+        y = np.asarray(y, dtype=float)
+        self.y_mean = y.mean()
+        y = y - self.y_mean
+        self.signal = max(y.var(), 1e-12)
+
+        best = -np.inf
+        for length_scale in self.LENGTH_SCALES:
+            for noise_share in self.NOISE_SHARES:
+                self.length_scale, self.noise = length_scale, noise_share * self.signal
+
+                L = np.linalg.cholesky(self.kernel(self.X, self.X) + self.noise * np.eye(len(y)))
+                alpha = np.linalg.solve(L.T, np.linalg.solve(L, y))
+                log_likelihood = -0.5 * y @ alpha - np.log(np.diag(L)).sum()
+
+                if log_likelihood > best:
+                    best, params = log_likelihood, (length_scale, self.noise, L, alpha)
+
+        self.length_scale, self.noise, L, self.alpha = params
+        # kept for the predictive std, k @ L_inv.T is O(n^2) per point
+        self.L_inv = np.linalg.inv(L)
+        return self
+
+    def predict(self, X, return_std=False):
+
+        k = self.kernel(np.asarray(X, dtype=float), self.X)
+        mean = self.y_mean + k @ self.alpha
+
+        if not return_std:
+            return mean
+
+        v = k @ self.L_inv.T
+        var = self.signal - (v**2).sum(axis=1)
+        return mean, np.sqrt(np.maximum(var, 0))
+
+
+class SurrogateExplorer:
+    """
+    Surrogate of y (and of the convergence rate) of PolicitalModel over a box of parameters.
+
+    Simulations go through sweep.run_sweep into the csv file `path`, so they are
+    accumulated (and resumed) between sessions: the points already in the file
+    are loaded and fitted at the start, new points get the ids after them. New points are chosen where
+    the surrogate is the most uncertain, queries in well covered regions are
+    answered by the surrogate without simulating.
+
+    bounds: {'p_e': (0, 0.3), 'u': (0.7, 1.5), ...}, other parameters go to the model.
+    """
+
+    def __init__(self, bounds, path, seed=0, processes=None, **model_kwargs):
+
+        self.names = list(bounds)
+        self.low = np.array([bounds[name][0] for name in self.names], dtype=float)
+        self.high = np.array([bounds[name][1] for name in self.names], dtype=float)
+
+        self.path = path
+        self.seed = seed
+        self.processes = processes
+        self.model_kwargs = model_kwargs
+
+        self.rng = np.random.default_rng(seed)
+        self.data = None
+        self.y_model = self.converged_model = None
+
+        done = read_done_points(path)
+        self.next_id = max(done, default=-1) + 1
+        if done:
+            self.data = pd.read_csv(path).sort_values('point_id').reset_index(drop=True)
+            self.fit()
+
+    def scale(self, X):
+        return (np.asarray(X, dtype=float) - self.low) / (self.high - self.low)
+
+    def to_points(self, X):
+        return [dict(zip(self.names, map(float, row))) for row in X]
+
+    def simulate(self, X):
+        """Runs the model in points X (rows in the order of self.names) and refits the surrogate"""
+
+        ids = list(range(self.next_id, self.next_id + len(X)))
+        self.next_id += len(X)
+
+        self.data = run_sweep(self.to_points(X), self.path, seed=self.seed, processes=self.processes,
+                              point_ids=ids, **self.model_kwargs)
+        self.fit()
+
+        return self.data.set_index('point_id').loc[ids].reset_index()
+
+    def fit(self):
+
+        X = self.scale(self.data[self.names].values)
+        self.y_model = GaussianProcess().fit(X, self.data['y'].values)
+        self.converged_model = GaussianProcess().fit(X, self.data['converged'].astype(float).values)
+
+    def predict(self, X):
+        """Surrogate y, its std and the probability of convergence in points X"""
+
+        X = self.scale(np.atleast_2d(X))
+        y, y_std = self.y_model.predict(X, return_std=True)
+        converged = np.clip(self.converged_model.predict(X), 0, 1)
+
+        return y, y_std, converged
+
+    def suggest(self, n, n_candidates=2000):
+        """
+        n points of the largest predictive std among random candidates.
+        The GP variance doesn't depend on y, so after each pick it is updated
+        as if the point was already simulated, which spreads the batch.
+        """
+
+        candidates = self.rng.uniform(self.low, self.high, size=(n_candidates, len(self.names)))
+        X = self.scale(candidates)
+
+        gp = self.y_model
+        train = gp.X
+        chosen = []
+
+        for _ in range(n):
+            K = gp.kernel(train, train) + gp.noise * np.eye(len(train))
+            k = gp.kernel(X, train)
+            var = gp.signal - (k * np.linalg.solve(K, k.T).T).sum(axis=1)
+            var[chosen] = -np.inf
+
+            best = int(np.argmax(var))
+            chosen.append(best)
+            train = np.vstack([train, X[best]])
+
+        return candidates[chosen]
+
+    def explore(self, n_initial=50, n_rounds=10, batch=20, target_std=None):
+        """
+        Random initial design, then rounds of simulations in the most uncertain points.
+        Stops early when the max std over the candidates falls below target_std.
+        """
+
+        if self.data is None:
+            self.simulate(self.rng.uniform(self.low, self.high, size=(n_initial, len(self.names))))
+
+        for _ in range(n_rounds):
+            if target_std is not None:
+                probe = self.rng.uniform(self.low, self.high, size=(2000, len(self.names)))
+                if self.predict(probe)[1].max() < target_std:
+                    break
+            self.simulate(self.suggest(batch))
+
+        return self.data
+
+    def query(self, params, max_std=0.02):
+        """
+        y in the point `params` (dict). Answered by the surrogate if its std
+        is below max_std, otherwise the point is simulated and added to the data.
+        """
+
+        x = np.array([[params[name] for name in self.names]])
+
+        if self.y_model is not None:
+            y, y_std, _ = self.predict(x)
+            if y_std[0] <= max_std:
+                return y[0]
+
+        return self.simulate(x)['y'].iloc[-1]
+
+    def get_surface(self, X):
+        """Surrogate predictions in points X as a DataFrame"""
+
+        y, y_std, converged = self.predict(X)
+        frame = pd.DataFrame(np.atleast_2d(X), columns=self.names)
+
+        return frame.assign(y=y, y_std=y_std, converged=converged)
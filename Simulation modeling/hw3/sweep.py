@@ -0,0 +1,156 @@
+import os
+import csv
+import itertools
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+
+from array_model import ArrayPoliticalModel
+from checkpoint import warm_start
+
+
+PARAM_NAMES = ['p_e', 'u', 'u_e', 'delta', 'mu']
+
+
+def param_grid(**values):
+    """All combinations of the given parameter values, e.g. param_grid(u=[0.7, 1.5], mu=[0.5])"""
+
+    names = list(values)
+    return [dict(zip(names, combination)) for combination in itertools.product(*values.values())]
+
+
+def point_seed(seed, point_id):
+    """Deterministic seed of a sweep point, doesn't depend on the order of execution"""
+
+    return int(np.random.SeedSequence([seed, point_id]).generate_state(1)[0])
+
+
+def make_model(engine, **kwargs):
+
+    if engine == 'array':
+        return ArrayPoliticalModel(**kwargs)
+    elif engine == 'mesa':
+        # imported here so that the array engine works without mesa
+        from main import PolicitalModel
+        return PolicitalModel(**kwargs)
+
+    raise ValueError(f"Unknown engine: {engine}")
+
+
+def run_point(task):
+    """Runs one sweep point, task = (point_id, params, seed, engine, model_kwargs)"""
+
+    point_id, params, seed, engine, model_kwargs = task
+
+    model = make_model(engine, seed=seed, **model_kwargs, **params)
+    model.run()
+
+    row = {'point_id': point_id, 'seed': seed}
+    row.update(params)
+    row['y'] = model.get_y()
+    row['converged'] = max(model.check_change_list) < model.change_threshold
+    row['run_iters'] = model.run_iters
+
+    return row
+
+
+def read_done_points(path):
+    """
+    Ids of the points already written to `path`.
+    A line cut by a crash is removed from the file.
+    """
+
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return set()
+
+    with open(path, 'rb+') as f:
+        data = f.read()
+        if not data.endswith(b'\n'):
+            f.truncate(data.rfind(b'\n') + 1)
+
+    if os.path.getsize(path) == 0:
+        return set()
+
+    return set(pd.read_csv(path, usecols=['point_id'])['point_id'])
+
+
+def run_sweep(points, path, seed=0, processes=None, engine='array', N=200,
+              change_threshold=1e-05, record='off', point_ids=None, **model_kwargs):
+    """
+    Runs PolicitalModel over the list of parameter dicts `points` on a process pool.
+
+    Every finished point is appended to the csv file `path` right away, so after
+    a crash the same call resumes and skips the points already on disk.
+    Point i uses the seed point_seed(seed, i), results don't depend on `processes`.
+    Trajectories are not recorded by default.
+
+    Points are numbered by their position in `points` unless point_ids are given,
+    e.g. to add new points to a file after the ids already there.
+    """
+
+    done = read_done_points(path)
+    if point_ids is None:
+        point_ids = range(len(points))
+
+    model_kwargs = dict(model_kwargs, N=N, change_threshold=change_threshold, record=record)
+    tasks = [
+        (i, params, point_seed(seed, i), engine, model_kwargs)
+        for i, params in zip(point_ids, points) if i not in done
+    ]
+
+    columns = ['point_id', 'seed'] + list(points[0]) + ['y', 'converged', 'run_iters']
+    new_file = len(done) == 0
+
+    with open(path, 'w' if new_file else 'a', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        if new_file:
+            writer.writeheader()
+
+        if processes == 1:
+            rows = map(run_point, tasks)
+            pool = None
+        else:
+            pool = Pool(processes)
+            rows = pool.imap_unordered(run_point, tasks)
+
+        try:
+            for row in rows:
+                writer.writerow(row)
+                f.flush()
+        finally:
+            if pool is not None:
+                pool.terminate()
+
+    return pd.read_csv(path).sort_values('point_id').reset_index(drop=True)
+
+
+def run_path(points, seed=0, engine='array', N=200, change_threshold=1e-05, record='off',
+             **model_kwargs):
+    """
+    Runs the points one after another, every point starts from the final state
+    of the previous one (see checkpoint.warm_start). For paths of close parameters,
+    e.g. a scan over u, this cuts the iterations per point.
+    """
+
+    rows = []
+    model = None
+
+    for i, params in enumerate(points):
+
+        if model is None:
+            model = make_model(engine, seed=seed, N=N, change_threshold=change_threshold,
+                               record=record, **model_kwargs, **params)
+        else:
+            model = warm_start(model, **params)
+
+        model.run()
+
+        row = {'point_id': i}
+        row.update(params)
+        row['y'] = model.get_y()
+        row['converged'] = max(model.check_change_list) < model.change_threshold
+        row['run_iters'] = model.run_iters
+        rows.append(row)
+
+    return pd.DataFrame(rows)
@@ -0,0 +1,15 @@
+# parameters of the bank shared by model.Bank, heap_model.HeapBank and queueing.erlang_a
+
+INTERVAL = 10  # mean time between arrivals
+
+MIN_PATIENCE = 1
+MAX_PATIENCE = 3
+
+
+def service_types(type1_prob=0.75):
+    """Mean service time, probability, bonus, profit and loss cost of both task types"""
+
+    return {
+        0: {'time': 9, 'prob': type1_prob, 'bonus': 0.3, 'profit': 3, 'loss_cost': 1.1},
+        1: {'time': 15, 'prob': 1 - type1_prob, 'bonus': 0.5, 'profit': 6, 'loss_cost': 2.5}
+    }
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+
+class EventLog:
+    """
+    Columnar log of completed and lost customers in preallocated arrays,
+    the arrays are doubled when they are full.
+    """
+
+    ACTIONS = ['completed', 'lost']
+    COLUMNS = ['action', 'task_type', 'profit', 'bonus', 'loss', 'time']
+
+    def __init__(self, capacity=1024):
+
+        self.size = 0
+        self.data = {name: np.empty(capacity, dtype=np.int8 if name in ('action', 'task_type') else float)
+                     for name in self.COLUMNS}
+
+    def append(self, action, task_type, profit, bonus, loss, time):
+
+        if self.size == len(self.data['time']):
+            for name, column in self.data.items():
+                self.data[name] = np.concatenate([column, np.empty_like(column)])
+
+        i = self.size
+        data = self.data
+        data['action'][i] = self.ACTIONS.index(action)
+        data['task_type'][i] = task_type
+        data['profit'][i] = profit
+        data['bonus'][i] = bonus
+        data['loss'][i] = loss
+        data['time'][i] = time
+
+        self.size += 1
+
+    def to_frame(self):
+        """Log as a DataFrame with the columns of the old Bank.events"""
+
+        frame = pd.DataFrame({name: column[:self.size] for name, column in self.data.items()})
+        frame['action'] = np.array(self.ACTIONS)[frame['action']]
+
+        return frame
@@ -0,0 +1,169 @@
+import heapq
+from collections import deque
+
+import bank_params
+from streams import CustomerStreams
+from event_log import EventLog
+from monitors import QueueMonitor, IncomeBins
+
+ARRIVAL, DEPARTURE = 0, 1
+
+
+class HeapBank:
+    """
+    The same bank as model.Bank without simpy: a binary heap of
+    (time, event type, task type) events and a FIFO queue of waiting customers.
+
+    Reneging needs no events of its own: a customer whose patience ended
+    before a window got free has left at the end of their patience,
+    so they are counted as lost when the queue reaches them (or at max_time).
+    Only the queue monitor needs them in time order: waiting customers are also kept
+    in a heap of patience deadlines, and the expired ones are passed to the monitor
+    at their deadlines before every event.
+
+    Customers come from CustomerStreams, with the same seed
+    the bank sees the same customers as model.Bank(seed=seed).
+    """
+
+    def __init__(self, num_windows=1, type1_prob=0.75, max_time=5000, seed=None, cost_per_window=0.03,
+                 record_events=False, income_dt=None):
+
+        self.num_windows = num_windows
+        self.service_types = bank_params.service_types(type1_prob)
+        self.interval = bank_params.INTERVAL
+        self.max_time = max_time
+
+        self.MIN_PATIENCE = bank_params.MIN_PATIENCE
+        self.MAX_PATIENCE = bank_params.MAX_PATIENCE
+
+        self.streams = CustomerStreams(seed, self.service_types, self.interval,
+                                       self.MIN_PATIENCE, self.MAX_PATIENCE)
+
+        self.cost_per_window = cost_per_window
+
+        self.now = 0
+        self.completed = [0, 0]
+        self.lost = [0, 0]
+        self.events = EventLog(int(1.2 * max_time / self.interval) + 16) if record_events else None
+        self.monitor = QueueMonitor(num_windows, self.MAX_PATIENCE)
+        # net income per interval of income_dt, see steady_state.profit_rates
+        self.income = IncomeBins(max_time, income_dt) if income_dt else None
+
+    def record(self, action, task_type, time):
+        """Puts a customer into the event log and the income bins, lost customers at the end of their patience"""
+
+        service_type = self.service_types[task_type]
+        if action == 'completed':
+            profit, bonus, loss = service_type['profit'], service_type['bonus'], 0
+        else:
+            profit, bonus, loss = 0, 0, service_type['loss_cost']
+
+        if self.events is not None:
+            self.events.append(action, task_type, profit, bonus, loss, time)
+        if self.income is not None:
+            self.income.add(time, profit - bonus - loss)
+
+    def run_until_time(self):
+
+        max_time = self.max_time
+        completed, lost = self.completed, self.lost
+        record = self.events is not None or self.income is not None
+        monitor = self.monitor
+
+        events = [(0.0, ARRIVAL, 0)]
+        queue = deque()  # [patience deadline, task type, service time, arrival time, still waiting]
+        waiting = []  # (patience deadline, customer number, queue entry)
+        free_windows = self.num_windows
+
+        customers, i, number = self.streams.draw(), 0, 0
+
+        while events:
+            now, kind, task_type = heapq.heappop(events)
+            if now >= max_time:
+                break
+
+            self.renege_until(waiting, now)
+
+            if kind == ARRIVAL:
+                if i == len(customers):
+                    customers, i = self.streams.draw(), 0
+                gap, task_type, patience, service = customers[i]
+                i += 1
+                number += 1
+
+                heapq.heappush(events, (now + gap, ARRIVAL, 0))
+                monitor.arrive(now, task_type)
+
+                if free_windows:
+                    free_windows -= 1
+                    monitor.start_service(now, 0)
+                    heapq.heappush(events, (now + service, DEPARTURE, task_type))
+                else:
+                    entry = [now + patience, task_type, service, now, True]
+                    queue.append(entry)
+                    heapq.heappush(waiting, (now + patience, number, entry))
+
+            else:
+                completed[task_type] += 1
+                monitor.finish_service(now)
+                if record:
+                    self.record('completed', task_type, now)
+
+                # the window goes to the first customer who is still waiting
+                while queue:
+                    entry = queue.popleft()
+                    deadline, next_type, service, arrival, _ = entry
+                    if deadline >= now:
+                        entry[4] = False
+                        monitor.start_service(now, now - arrival)
+                        heapq.heappush(events, (now + service, DEPARTURE, next_type))
+                        break
+                    lost[next_type] += 1
+                    if record:
+                        self.record('lost', next_type, deadline)
+                else:
+                    free_windows += 1
+
+        self.now = max_time
+        self.renege_until(waiting, max_time)
+        for deadline, task_type, *_ in queue:
+            if deadline < max_time:
+                lost[task_type] += 1
+                if record:
+                    self.record('lost', task_type, deadline)
+
+        return self.fin_result()
+
+    def renege_until(self, waiting, now):
+        """Passes customers whose patience ended before `now` to the monitor, at their deadlines"""
+
+        while waiting and waiting[0][0] < now:
+            deadline, _, entry = heapq.heappop(waiting)
+            if entry[4]:
+                entry[4] = False
+                self.monitor.renege(deadline, deadline - entry[3], entry[1])
+
+    def fin_result(self):
+
+        types = self.service_types
+        totals = sum(
+            self.completed[i] * (types[i]['profit'] - types[i]['bonus']) - self.lost[i] * types[i]['loss_cost']
+            for i in types
+        )
+
+        # fixed cost as employees are paid hourly
+        fixed_cost = self.cost_per_window * self.num_windows * self.now
+
+        return totals - fixed_cost
+
+    def report(self):
+        """Net profit together with the queue monitors"""
+
+        return dict(net_profit=self.fin_result(), completed=list(self.completed), lost=list(self.lost),
+                    **self.monitor.report(self.now))
+
+    def get_events(self):
+        """Log of the events (action, task_type, profit, bonus, loss, time), needs record_events=True"""
+
+        assert self.events is not None, 'events are recorded only with record_events=True'
+        return self.events.to_frame()
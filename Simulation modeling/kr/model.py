@@ -1,17 +1,17 @@
-import random
 import simpy
-import numpy as np
-import pandas as pd
+
+import bank_params
+from streams import CustomerStreams
+from event_log import EventLog
+from monitors import QueueMonitor, IncomeBins
 
 class Bank:
-    def __init__(self, env, num_windows=1, type1_prob=0.75, max_time=5000, print_logs=True):
+    def __init__(self, env, num_windows=1, type1_prob=0.75, max_time=5000, print_logs=True, seed=None,
+                 record_events=False, cost_per_window=0.03, income_dt=None):
 
         self.num_windows = num_windows
-        self.service_types = {
-            0: {'time': 9, 'prob': type1_prob, 'bonus': 0.3, 'profit': 3, 'loss_cost': 1.1},
-            1: {'time': 15, 'prob': 1 - type1_prob, 'bonus': 0.5, 'profit': 6, 'loss_cost': 2.5}
-        }
-        self.interval = 10
+        self.service_types = bank_params.service_types(type1_prob)
+        self.interval = bank_params.INTERVAL
         self.max_time = max_time
         self.env = env
         # self.queue = simpy.Store(self.env)
@@ -19,12 +19,24 @@ class Bank:
         self.customer_visits_data = {}
         self.print_logs = print_logs
 
-        self.MIN_PATIENCE = 1
-        self.MAX_PATIENCE = 3
-        
-        self.events = []
+        self.MIN_PATIENCE = bank_params.MIN_PATIENCE
+        self.MAX_PATIENCE = bank_params.MAX_PATIENCE
+
+        # variates are drawn in blocks from the bank's own generators,
+        # with the same seed banks with different num_windows see the same customers
+        self.streams = CustomerStreams(seed, self.service_types, self.interval,
+                                       self.MIN_PATIENCE, self.MAX_PATIENCE)
+
+        # running totals by task type, the full log only with record_events
+        self.completed = [0, 0]
+        self.lost = [0, 0]
+        self.profit = self.bonus = self.loss = 0
+        self.events = EventLog(int(1.2 * max_time / self.interval) + 16) if record_events else None
+        self.monitor = QueueMonitor(num_windows, self.MAX_PATIENCE)
+        # net income per interval of income_dt, see steady_state.profit_rates
+        self.income = IncomeBins(max_time, income_dt) if income_dt else None
 
-        self.cost_per_window = 0.03
+        self.cost_per_window = cost_per_window
 
     def run_until_time(self):
             
@@ -38,24 +50,22 @@ class Bank:
         """Source generates customers randomly"""
         customer_count = 0
         while True:
-            task_type = np.random.choice(
-                [0, 1], p=[self.service_types[0]['prob'], self.service_types[1]['prob']]
-            )
-            c = self.customer(name=f'Customer{customer_count}', task_type=task_type)
+            t, task_type, patience, service_time = self.streams.next_customer()
+            c = self.customer(name=f'Customer{customer_count}', task_type=task_type,
+                              patience=patience, service_time=service_time)
             self.env.process(c)
-            t = random.expovariate(1.0 / self.interval)
             yield self.env.timeout(t)
             customer_count += 1
             
 
-    def customer(self, name, task_type):
+    def customer(self, name, task_type, patience, service_time):
         """Customer arrives, is served and leaves."""
         arrive = self.env.now
         if self.print_logs:
             print('%7.4f %s: Here I am' % (arrive, name))
+        self.monitor.arrive(arrive, task_type)
     
         with self.counter.request() as req:
-            patience = random.uniform(self.MIN_PATIENCE, self.MAX_PATIENCE)
             # Wait for the counter or abort at the end of our tether
             results = yield req | self.env.timeout(patience)
     
@@ -65,39 +75,60 @@ class Bank:
                 # We got to the counter
                 if self.print_logs:
                     print('%7.4f %s: Waited %6.3f' % (self.env.now, name, wait))
+                self.monitor.start_service(self.env.now, wait)
 
-                time_in_bank = self.service_types[task_type]['time']
-                yield self.env.timeout(random.expovariate(1.0 / time_in_bank))
+                yield self.env.timeout(service_time)
+                self.monitor.finish_service(self.env.now)
     
                     
                 if self.print_logs:
                     print('%7.4f %s: Finished' % (self.env.now, name))
 
-                self.events.append(("completed",
-                                   self.service_types[task_type]['profit'],
-                                   self.service_types[task_type]['bonus'], 
-                                   0, 
-                                   self.env.now),
-                                )
+                service_type = self.service_types[task_type]
+                self.completed[task_type] += 1
+                self.profit += service_type['profit']
+                self.bonus += service_type['bonus']
+
+                if self.events is not None:
+                    self.events.append("completed", task_type, service_type['profit'],
+                                       service_type['bonus'], 0, self.env.now)
+                if self.income is not None:
+                    self.income.add(self.env.now, service_type['profit'] - service_type['bonus'])
     
             else:
                 # We reneged
                 if self.print_logs:
                     print('%7.4f %s: RENEGED after %6.3f' % (self.env.now, name, wait))
+                self.monitor.renege(self.env.now, wait, task_type)
 
-                self.events.append(("lost", 0, 0, self.service_types[task_type]['loss_cost'], self.env.now))
+                loss_cost = self.service_types[task_type]['loss_cost']
+                self.lost[task_type] += 1
+                self.loss += loss_cost
 
+                if self.events is not None:
+                    self.events.append("lost", task_type, 0, 0, loss_cost, self.env.now)
+                if self.income is not None:
+                    self.income.add(self.env.now, -loss_cost)
 
-    def fin_result(self):
-        # action, profit, bonus, loss, time
 
-        data = pd.DataFrame(self.events, columns=['action', 'profit', 'bonus', 'loss', 'time'])
-        totals = data[[ 'profit', 'bonus', 'loss',]].sum()
+    def fin_result(self):
 
         # fixed cost as employees are paid hourly
         fixed_cost = self.cost_per_window * self.num_windows * self.env.now
 
-        net_profit = totals['profit'] - totals['bonus'] - totals['loss'] - fixed_cost
+        net_profit = self.profit - self.bonus - self.loss - fixed_cost
 
         return net_profit
+
+    def report(self):
+        """Net profit together with the queue monitors"""
+
+        return dict(net_profit=self.fin_result(), completed=list(self.completed), lost=list(self.lost),
+                    **self.monitor.report(self.env.now))
+
+    def get_events(self):
+        """Log of the events (action, task_type, profit, bonus, loss, time), needs record_events=True"""
+
+        assert self.events is not None, 'events are recorded only with record_events=True'
+        return self.events.to_frame()
         
\ No newline at end of file
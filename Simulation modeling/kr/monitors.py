@@ -0,0 +1,91 @@
+import numpy as np
+
+
+class QueueMonitor:
+    """
+    Incremental monitors of the bank: time-weighted queue length and busy windows,
+    histograms of waiting times of served and reneged customers in fixed bins
+    and arrivals / losses by task type. Memory doesn't depend on the simulated time.
+
+    The last bin of the histograms takes every wait above max_wait.
+    """
+
+    def __init__(self, num_windows, max_wait=3, bin_width=0.25):
+
+        self.num_windows = num_windows
+        self.bin_width = bin_width
+        self.num_bins = int(np.ceil(max_wait / bin_width)) + 1
+
+        self.last_time = 0
+        self.queue = self.busy = self.max_queue = 0
+        self.queue_area = self.busy_area = 0
+
+        self.served_waits = [0] * self.num_bins
+        self.reneged_waits = [0] * self.num_bins
+        self.arrived = [0, 0]
+        self.lost = [0, 0]
+
+    def update(self, now, queue=0, busy=0):
+        """Adds the areas since the last change and changes the queue / busy windows by the given steps"""
+
+        elapsed = now - self.last_time
+        self.queue_area += self.queue * elapsed
+        self.busy_area += self.busy * elapsed
+        self.last_time = now
+
+        self.queue += queue
+        self.busy += busy
+        if self.queue > self.max_queue:
+            self.max_queue = self.queue
+
+    def arrive(self, now, task_type):
+        self.arrived[task_type] += 1
+        self.update(now, queue=1)
+
+    def start_service(self, now, wait):
+        self.served_waits[min(int(wait / self.bin_width), self.num_bins - 1)] += 1
+        self.update(now, queue=-1, busy=1)
+
+    def finish_service(self, now):
+        self.update(now, busy=-1)
+
+    def renege(self, now, wait, task_type):
+        self.reneged_waits[min(int(wait / self.bin_width), self.num_bins - 1)] += 1
+        self.lost[task_type] += 1
+        self.update(now, queue=-1)
+
+    def bin_edges(self):
+        return np.append(np.arange(self.num_bins) * self.bin_width, np.inf)
+
+    def report(self, now):
+        """Time averages up to now and the counters"""
+
+        self.update(now)
+        duration = max(now, 1e-12)
+
+        return {
+            'mean_queue': self.queue_area / duration,
+            'max_queue': self.max_queue,
+            'mean_busy_windows': self.busy_area / duration,
+            'utilisation': self.busy_area / duration / self.num_windows,
+            'abandonment_rate': [lost / max(arrived, 1) for lost, arrived in zip(self.lost, self.arrived)],
+            'served_waits': list(self.served_waits),
+            'reneged_waits': list(self.reneged_waits),
+        }
+
+
+class IncomeBins:
+    """
+    Net income (profit - bonus - loss) of the bank summed in consecutive intervals of length dt,
+    events after the last whole interval before max_time are dropped.
+    """
+
+    def __init__(self, max_time, dt):
+
+        self.dt = dt
+        self.income = np.zeros(int(max_time // dt))
+
+    def add(self, time, amount):
+        i = int(time // self.dt)
+        if i < len(self.income):
+            self.income[i] += amount
@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+
+import bank_params
+
+
+def erlang_a(num_windows=1, type1_prob=0.75, cost_per_window=0.03, horizon=5000, max_queue=30):
+    """
+    Erlang-A style approximation of Bank: a CTMC of (type 1 customers in service,
+    type 2 customers in service, queue length) with exponential patience of the
+    same mean, queue truncated at max_queue. The type of the customer taken from the
+    queue is type 1 with probability type1_prob, since all waiting customers renege
+    at the same rate.
+
+    Returns abandonment probability, throughput, utilisation, profit per unit time
+    and net profit over `horizon` (comparable to fin_result of Bank(max_time=horizon)).
+    """
+
+    types = bank_params.service_types(type1_prob)
+    c = num_windows
+    p = types[0]['prob']
+    arrival_rate = 1 / bank_params.INTERVAL
+    mu = [1 / types[0]['time'], 1 / types[1]['time']]
+    renege_rate = 2 / (bank_params.MIN_PATIENCE + bank_params.MAX_PATIENCE)
+
+    states = [(a, b, 0) for a in range(c + 1) for b in range(c + 1 - a)]
+    states += [(a, c - a, q) for q in range(1, max_queue + 1) for a in range(c + 1)]
+    index = {state: i for i, state in enumerate(states)}
+
+    Q = np.zeros((len(states), len(states)))
+
+    def add(state, next_state, rate):
+        if rate > 0:
+            Q[index[state], index[next_state]] += rate
+
+    for a, b, q in states:
+        state = (a, b, q)
+
+        if a + b < c:
+            add(state, (a + 1, b, q), arrival_rate * p)
+            add(state, (a, b + 1, q), arrival_rate * (1 - p))
+        elif q < max_queue:
+            add(state, (a, b, q + 1), arrival_rate)
+
+        if q > 0:
+            # the window goes to the next customer of the queue
+            add(state, (a, b, q - 1), a * mu[0] * p + b * mu[1] * (1 - p))
+            if a > 0:
+                add(state, (a - 1, b + 1, q - 1), a * mu[0] * (1 - p))
+            if b > 0:
+                add(state, (a + 1, b - 1, q - 1), b * mu[1] * p)
+            add(state, (a, b, q - 1), q * renege_rate)
+        else:
+            if a > 0:
+                add(state, (a - 1, b, q), a * mu[0])
+            if b > 0:
+                add(state, (a, b - 1, q), b * mu[1])
+
+    np.fill_diagonal(Q, -Q.sum(axis=1))
+
+    # pi Q = 0 with one equation replaced by sum(pi) = 1
+    A = Q.T.copy()
+    A[-1] = 1
+    rhs = np.zeros(len(states))
+    rhs[-1] = 1
+    pi = np.linalg.solve(A, rhs)
+
+    a, b, q = np.array(states).T
+    renege_flow = renege_rate * pi @ q
+
+    income_rate = (
+        pi @ a * mu[0] * (types[0]['profit'] - types[0]['bonus'])
+        + pi @ b * mu[1] * (types[1]['profit'] - types[1]['bonus'])
+        - renege_flow * (p * types[0]['loss_cost'] + (1 - p) * types[1]['loss_cost'])
+    )
+    profit_rate = income_rate - cost_per_window * c
+
+    return {'num_windows': c, 'abandonment_prob': renege_flow / arrival_rate,
+            'throughput': arrival_rate - renege_flow, 'utilisation': pi @ (a + b) / c,
+            'mean_queue': pi @ q, 'profit_rate': profit_rate, 'net_profit': profit_rate * horizon}
+
+
+def prune(num_windows=range(1, 15), keep=3, **kwargs):
+    """
+    Approximate net profit for every number of windows, the `keep` best ones
+    are marked as contenders to be simulated.
+    """
+
+    frame = pd.DataFrame([erlang_a(c, **kwargs) for c in num_windows])
+    frame['contender'] = frame['net_profit'].rank(ascending=False, method='first') <= keep
+
+    return frame
@@ -0,0 +1,191 @@
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+import simpy
+from scipy import stats
+
+import model
+import heap_model
+
+
+class Welford:
+    """Streaming mean and variance of the replication results"""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, value):
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (value - self.mean)
+
+    @property
+    def var(self):
+        return self.m2 / (self.n - 1) if self.n > 1 else np.inf
+
+    def half_width(self, confidence_lvl=0.95):
+        """Half-width of the t confidence interval of the mean, the same as confidence_interval"""
+
+        if self.n < 2:
+            return np.inf
+        return np.sqrt(self.var / self.n) * stats.t.ppf((1 + confidence_lvl) / 2, self.n - 1)
+
+
+def replication_seed(seed, config_id, rep, common_random_numbers=False):
+    """
+    Seed of the replication rep of the configuration config_id. With common random
+    numbers the replication rep of every configuration gets the same customers.
+    """
+
+    key = [seed, rep] if common_random_numbers else [seed, config_id, rep]
+    return int(np.random.SeedSequence(key).generate_state(1)[0])
+
+
+def make_bank(backend='heap', seed=None, **bank_kwargs):
+    """Bank ('simpy') or HeapBank ('heap') without logs"""
+
+    if backend == 'heap':
+        return heap_model.HeapBank(seed=seed, **bank_kwargs)
+
+    assert backend == 'simpy', "backend must be 'heap' or 'simpy'"
+    return model.Bank(simpy.Environment(), print_logs=False, seed=seed, **bank_kwargs)
+
+
+def run_replication(task):
+    """
+    Net profit of one replication, task = (backend, seed, bank kwargs),
+    with (backend, seed, bank kwargs, True) the whole report of the bank.
+    """
+
+    backend, seed, bank_kwargs, *report = task
+    bank = make_bank(backend, seed, **bank_kwargs)
+    net_profit = bank.run_until_time()
+
+    return bank.report() if any(report) else net_profit
+
+
+class AdaptiveReplications:
+    """
+    Replications of Bank for several configurations until every one of them is settled.
+
+    A configuration (dict of Bank kwargs, e.g. {'num_windows': 3}) gets
+    replications in batches. It stops when the half-width of its net profit CI
+    is below target_half_width, or when it is dominated: its upper CI bound
+    is below the lower bound of another configuration.
+    Only streaming means and variances are kept, the results aren't stored.
+
+    Every replication has its own seed from (seed, configuration, replication number),
+    so the results don't depend on the number of processes. With common_random_numbers
+    the configuration is left out of the seed (see paired_differences).
+    """
+
+    def __init__(self, configs, target_half_width, confidence_lvl=0.9, min_reps=20, max_reps=2000,
+                 batch=20, seed=0, processes=None, backend='heap', common_random_numbers=False,
+                 **bank_kwargs):
+
+        assert min_reps >= 2, 'at least 2 replications are needed for a CI'
+        assert max_reps >= min_reps, 'max_reps must be at least min_reps'
+
+        self.configs = [dict(bank_kwargs, **config) for config in configs]
+        self.target_half_width = target_half_width
+        self.confidence_lvl = confidence_lvl
+        self.min_reps = min_reps
+        self.max_reps = max_reps
+        self.batch = batch
+        self.seed = seed
+        self.processes = processes
+        self.backend = backend
+        self.common_random_numbers = common_random_numbers
+
+        self.stats = [Welford() for _ in self.configs]
+        self.status = ['active'] * len(self.configs)
+
+    def interval(self, i):
+        s = self.stats[i]
+        half_width = s.half_width(self.confidence_lvl)
+        return s.mean - half_width, s.mean + half_width
+
+    def tasks(self, i):
+        n = self.stats[i].n
+        size = max(self.batch, self.min_reps - n)
+        size = min(size, self.max_reps - n)
+
+        return [(self.backend, replication_seed(self.seed, i, rep, self.common_random_numbers),
+                 self.configs[i]) for rep in range(n, n + size)]
+
+    def update_status(self):
+
+        active = [i for i, status in enumerate(self.status) if status == 'active']
+        ready = [i for i in range(len(self.configs)) if self.stats[i].n >= self.min_reps]
+        best_lower = max((self.interval(i)[0] for i in ready), default=-np.inf)
+
+        for i in active:
+            if self.stats[i].n < self.min_reps:
+                continue
+            lower, upper = self.interval(i)
+            if upper < best_lower:
+                self.status[i] = 'dominated'
+            elif upper - lower <= 2 * self.target_half_width:
+                self.status[i] = 'settled'
+            elif self.stats[i].n >= self.max_reps:
+                self.status[i] = 'max_reps'
+
+    def run(self):
+
+        pool = Pool(self.processes) if self.processes != 1 else None
+
+        try:
+            while 'active' in self.status:
+                active = [i for i, status in enumerate(self.status) if status == 'active']
+                tasks = [(i, task) for i in active for task in self.tasks(i)]
+
+                # ordered map, so the streaming statistics don't depend on the scheduling
+                run = pool.imap if pool is not None else map
+                for (i, _), result in zip(tasks, run(run_replication, [task for _, task in tasks])):
+                    self.stats[i].update(result)
+
+                self.update_status()
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        return self.get_results()
+
+    def get_results(self):
+
+        rows = []
+        for i, config in enumerate(self.configs):
+            lower, upper = self.interval(i)
+            rows.append(dict(config, n=self.stats[i].n, mean=self.stats[i].mean,
+                             std=np.sqrt(self.stats[i].var), lower=lower, upper=upper,
+                             status=self.status[i]))
+
+        return pd.DataFrame(rows)
+
+
+def paired_differences(config_a, config_b, reps, seed=0, confidence_lvl=0.9, processes=None,
+                       backend='heap', **bank_kwargs):
+    """
+    CI of the mean net profit difference a - b from reps pairs of replications
+    with common random numbers: both banks of a pair see the same customers.
+    """
+
+    configs = [dict(bank_kwargs, **config_a), dict(bank_kwargs, **config_b)]
+    tasks = [(backend, replication_seed(seed, i, rep, True), config)
+             for rep in range(reps) for i, config in enumerate(configs)]
+
+    with Pool(processes) as pool:
+        results = pool.map(run_replication, tasks)
+
+    diff = Welford()
+    for a, b in zip(results[::2], results[1::2]):
+        diff.update(a - b)
+
+    half_width = diff.half_width(confidence_lvl)
+    return {'mean': diff.mean, 'std': np.sqrt(diff.var),
+            'lower': diff.mean - half_width, 'upper': diff.mean + half_width}
@@ -0,0 +1,136 @@
+from itertools import product
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+
+from replications import replication_seed, run_replication
+
+
+def candidate_grid(num_windows=range(1, 15), type1_prob=None, cost_per_window=None):
+    """Configurations of Bank from all combinations of the given values"""
+
+    values = {'num_windows': list(num_windows)}
+    if type1_prob is not None:
+        values['type1_prob'] = list(type1_prob)
+    if cost_per_window is not None:
+        values['cost_per_window'] = list(cost_per_window)
+
+    return [dict(zip(values, combination)) for combination in product(*values.values())]
+
+
+class RankingAndSelection:
+    """
+    Kim-Nelson fully sequential procedure for the configuration of Bank with the largest mean net profit.
+
+    All candidates get n0 replications with common random numbers, then
+    the surviving candidates get one more replication per stage and a candidate
+    is eliminated once its mean is below the mean of another one by more than
+    the shrinking continuation region. With probability at least 1 - alpha the
+    selected configuration is the best one or is within delta of the best
+    (indifference zone). Clearly worse candidates are dropped after n0 replications,
+    so the replications go to the close contenders.
+    """
+
+    def __init__(self, candidates, delta, alpha=0.05, n0=20, max_reps=5000, batch=10,
+                 seed=0, processes=None, backend='heap', **bank_kwargs):
+
+        assert n0 >= 2, 'at least 2 first stage replications are needed'
+        assert len(candidates) >= 2, 'nothing to select from'
+
+        self.candidates = [dict(bank_kwargs, **candidate) for candidate in candidates]
+        self.delta = delta
+        self.alpha = alpha
+        self.n0 = n0
+        self.max_reps = max_reps
+        self.batch = batch
+        self.seed = seed
+        self.processes = processes
+        self.backend = backend
+
+        k = len(self.candidates)
+        eta = 0.5 * ((2 * alpha / (k - 1)) ** (-2 / (n0 - 1)) - 1)
+        self.h2 = 2 * eta * (n0 - 1)
+
+        self.n = 0
+        self.sums = np.zeros(k)
+        self.alive = np.ones(k, dtype=bool)
+        self.eliminated_at = np.full(k, -1)
+
+    def simulate(self, candidates, reps, pool):
+        """Results of replications reps of the candidates, shape (len(reps), len(candidates))"""
+
+        tasks = [(self.backend, replication_seed(self.seed, 0, rep, True), self.candidates[i])
+                 for rep in reps for i in candidates]
+        run = pool.imap if pool is not None else map
+
+        return np.fromiter(run(run_replication, tasks), dtype=float).reshape(len(reps), len(candidates))
+
+    def run(self):
+        """Runs the procedure, returns the selected configuration"""
+
+        pool = Pool(self.processes) if self.processes != 1 else None
+
+        try:
+            first_stage = self.simulate(range(len(self.candidates)), range(self.n0), pool)
+            self.sums += first_stage.sum(axis=0)
+            self.n = self.n0
+
+            # variances of the pairwise differences from the first stage
+            diffs = first_stage[:, :, None] - first_stage[:, None, :]
+            self.S2 = diffs.var(axis=0, ddof=1)
+
+            self.eliminate()
+
+            while self.alive.sum() > 1 and self.n < self.max_reps:
+                alive = np.flatnonzero(self.alive)
+                size = min(self.batch, self.max_reps - self.n)
+                results = self.simulate(alive, range(self.n, self.n + size), pool)
+
+                # screening after every replication, as in the sequential procedure
+                for row in results:
+                    if self.alive.sum() == 1:
+                        break
+                    keep = self.alive[alive]
+                    self.sums[alive[keep]] += row[keep]
+                    self.n += 1
+                    self.eliminate()
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        return self.get_best()
+
+    def eliminate(self):
+
+        r = self.n
+        alive = np.flatnonzero(self.alive)
+        means = self.sums[alive] / r
+
+        S2 = self.S2[np.ix_(alive, alive)]
+        W = np.maximum(0, self.delta / (2 * r) * (self.h2 * S2 / self.delta**2 - r))
+
+        # i is out if some l is better by more than W_il
+        out = (means[:, None] < means[None, :] - W).any(axis=1)
+
+        self.alive[alive[out]] = False
+        self.eliminated_at[alive[out]] = r
+
+    def get_best(self):
+        """The surviving configuration, the one with the largest mean if max_reps was hit"""
+
+        alive = np.flatnonzero(self.alive)
+        best = alive[np.argmax(self.sums[alive])]
+        return self.candidates[best]
+
+    def get_results(self):
+
+        reps = np.where(self.alive, self.n, self.eliminated_at)
+        frame = pd.DataFrame(self.candidates)
+
+        return frame.assign(reps=reps, mean=self.sums / reps, alive=self.alive)
+
+    @property
+    def total_reps(self):
+        return int(np.where(self.alive, self.n, self.eliminated_at).sum())
@@ -0,0 +1,69 @@
+import numpy as np
+from scipy import stats
+
+from replications import make_bank
+
+
+def profit_rates(bank):
+    """
+    Net profit per unit of time of a finished bank with income_dt
+    in consecutive intervals of length income_dt.
+    """
+
+    assert bank.income is not None, 'income is binned only with income_dt'
+    income = bank.income
+
+    return income.income / income.dt - bank.cost_per_window * bank.num_windows
+
+
+def mser(series, batch=5):
+    """
+    MSER-batch truncation point: number of first observations to drop which minimizes
+    the squared standard error of the mean of the rest. Only the first half is searched.
+    """
+
+    num_batches = len(series) // batch
+    means = series[:num_batches * batch].reshape(num_batches, batch).mean(axis=1)
+
+    # sums over the tails means[d:]
+    tail = num_batches - np.arange(num_batches)
+    tail_sum = np.cumsum(means[::-1])[::-1]
+    tail_sum2 = np.cumsum(means[::-1]**2)[::-1]
+    sse = tail_sum2 - tail_sum**2 / tail
+
+    half = num_batches // 2
+    d = int(np.argmin(sse[:half] / tail[:half]**2))
+
+    return d * batch
+
+
+def batch_means(series, num_batches=20, confidence_lvl=0.95):
+    """Mean of the series and the half-width of its CI from num_batches batch means"""
+
+    size = len(series) // num_batches
+    means = series[len(series) - size * num_batches:].reshape(num_batches, size).mean(axis=1)
+
+    half_width = stats.sem(means) * stats.t.ppf((1 + confidence_lvl) / 2, num_batches - 1)
+    return means.mean(), half_width
+
+
+def steady_state_profit(num_windows=1, max_time=200000, dt=10, num_batches=20, confidence_lvl=0.95,
+                        horizon=5000, seed=None, backend='heap', **bank_kwargs):
+    """
+    Steady state net profit of Bank from one long run: the warm-up found by MSER-5
+    is dropped, the CI of the profit rate comes from batch means.
+    The rate is also reported as net profit over `horizon`, comparable to fin_result
+    of Bank(max_time=horizon).
+    """
+
+    bank = make_bank(backend, seed, num_windows=num_windows, max_time=max_time,
+                     income_dt=dt, **bank_kwargs)
+    bank.run_until_time()
+
+    rates = profit_rates(bank)
+    warmup = mser(rates)
+    rate, half_width = batch_means(rates[warmup:], num_batches, confidence_lvl)
+
+    return {'profit_rate': rate, 'lower': rate - half_width, 'upper': rate + half_width,
+            'warmup_time': warmup * dt, 'net_profit': rate * horizon,
+            'net_profit_lower': (rate - half_width) * horizon, 'net_profit_upper': (rate + half_width) * horizon}
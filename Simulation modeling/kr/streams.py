@@ -0,0 +1,52 @@
+import numpy as np
+
+
+class CustomerStreams:
+    """
+    Random variates of the bank customers from dedicated streams.
+
+    Arrival gaps, task types, patience and service demand have their own
+    Generators spawned from one seed, and every customer takes exactly one value
+    of each stream, so customer k is the same in every bank with this seed
+    whatever happens to them there (common random numbers).
+    Service time is the unit exponential demand scaled by the mean time of the task type.
+
+    Variates are drawn in blocks of BLOCK_SIZE when the previous block is used up,
+    seed=None takes a fresh seed from the OS.
+    """
+
+    BLOCK_SIZE = 512
+
+    def __init__(self, seed, service_types, interval=10, min_patience=1, max_patience=3):
+
+        self.gap_rng, self.type_rng, self.patience_rng, self.service_rng = [
+            np.random.default_rng(s) for s in np.random.SeedSequence(seed).spawn(4)
+        ]
+
+        self.interval = interval
+        self.type1_prob = service_types[0]['prob']
+        self.mean_time = np.array([service_types[0]['time'], service_types[1]['time']])
+        self.min_patience = min_patience
+        self.max_patience = max_patience
+
+        self.customers = []
+        self.position = 0
+
+    def draw(self):
+        """Next block of (gap to the next arrival, task type, patience, service time) tuples"""
+
+        n = self.BLOCK_SIZE
+        gaps = self.gap_rng.exponential(self.interval, n)
+        task_types = (self.type_rng.random(n) >= self.type1_prob).astype(int)
+        patience = self.patience_rng.uniform(self.min_patience, self.max_patience, n)
+        service = self.service_rng.standard_exponential(n) * self.mean_time[task_types]
+
+        return list(zip(gaps.tolist(), task_types.tolist(), patience.tolist(), service.tolist()))
+
+    def next_customer(self):
+
+        if self.position == len(self.customers):
+            self.customers, self.position = self.draw(), 0
+
+        self.position += 1
+        return self.customers[self.position - 1]